@@ -4,8 +4,9 @@ import os
 import re
 from dataclasses import dataclass
 
-from dotenv import dotenv_values
+from ch_analyser import env_cache
 
+USER_PREFIX = "APP_USER_"
 USER_PATTERN = re.compile(r"^APP_USER_(\d+)_(.+)$")
 
 
@@ -27,20 +28,11 @@ class UserManager:
         if not os.path.exists(self._env_path):
             return
 
-        values = dotenv_values(self._env_path)
-        indices: dict[int, dict[str, str]] = {}
-
-        for key, val in values.items():
-            m = USER_PATTERN.match(key)
-            if m:
-                idx = int(m.group(1))
-                field_name = m.group(2)
-                indices.setdefault(idx, {})[field_name] = val or ""
-
+        values = env_cache.load_env(self._env_path)
+        indices = env_cache.parse_indexed(values, USER_PREFIX, USER_PATTERN)
         for idx in sorted(indices):
             data = indices[idx]
-            name = data.get("NAME", "")
-            if not name:
+            if not (name := data.get("NAME")):
                 continue
             self._users[name] = UserConfig(
                 name=name,
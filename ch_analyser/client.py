@@ -1,40 +1,121 @@
+import logging
+import threading
 import time
+from collections.abc import Iterator
 from datetime import date, datetime
-
-from clickhouse_driver import Client as NativeClient
-import clickhouse_connect
+from itertools import repeat
+from typing import TYPE_CHECKING
 
 from ch_analyser.config import ConnectionConfig
 from ch_analyser.logging_config import get_logger
 
+# Drivers are imported on first connect: clickhouse_connect in particular
+# pulls in urllib3/certifi/lz4 and noticeably slows application startup.
+if TYPE_CHECKING:
+    from clickhouse_driver import Client as NativeClient
+
+# Session settings for the native protocol: larger blocks mean fewer
+# block headers and decompression calls on wide system-table scans.
+NATIVE_SETTINGS = {"max_block_size": 65536}
+
 logger = get_logger(__name__)
 
 
+def _escape_str(v: str) -> str:
+    escaped = v.replace("\\", "\\\\").replace("'", "\\'")
+    return f"'{escaped}'"
+
+
+def _escape_seq(v) -> str:
+    return "(" + ", ".join(map(_escape_value, v)) + ")"
+
+
+# Exact-type dispatch for _escape_value; subclasses are resolved via the MRO
+_ESCAPERS = {
+    type(None): lambda v: "NULL",
+    bool: lambda v: "1" if v else "0",
+    int: str,
+    float: repr,
+    str: _escape_str,
+    date: lambda v: f"'{v}'",
+    datetime: lambda v: f"'{v}'",
+    list: _escape_seq,
+    tuple: _escape_seq,
+}
+
+
+def _resolve_escaper(tp: type):
+    for base in tp.__mro__[1:]:
+        handler = _ESCAPERS.get(base)
+        if handler is not None:
+            break
+    else:
+        handler = str
+    _ESCAPERS[tp] = handler
+    return handler
+
+
 def _escape_value(v):
     """Escape a Python value for safe inline substitution into a ClickHouse SQL query."""
-    if v is None:
-        return "NULL"
-    if isinstance(v, bool):
-        return "1" if v else "0"
-    if isinstance(v, int):
-        return str(v)
-    if isinstance(v, float):
-        return repr(v)
-    if isinstance(v, str):
-        escaped = v.replace("\\", "\\\\").replace("'", "\\'")
-        return f"'{escaped}'"
-    if isinstance(v, (date, datetime)):
-        return f"'{v}'"
-    if isinstance(v, (list, tuple)):
-        return "(" + ", ".join(_escape_value(x) for x in v) + ")"
-    return str(v)
+    handler = _ESCAPERS.get(type(v))
+    if handler is None:
+        handler = _resolve_escaper(type(v))
+    return handler(v)
+
+
+def substitute_params(query: str, params: dict | None) -> str:
+    """Inline *params* into a ``%(name)s``-style *query* as escaped literals."""
+    if params:
+        escaped = {k: _escape_value(v) for k, v in params.items()}
+        query = query % escaped
+    return query
+
+
+def _rows_to_dicts(col_names: tuple[str, ...], data) -> list[dict]:
+    """Materialize result rows as dicts keyed by column name.
+
+    The zip/dict construction is driven by ``map`` so the per-row loop runs
+    in C instead of a Python-level comprehension.
+    """
+    return list(map(dict, map(zip, repeat(col_names), data)))
 
 
 class CHClient:
     def __init__(self, config: ConnectionConfig):
         self._config = config
-        self._native_client: NativeClient | None = None
+        self._native_client: "NativeClient | None" = None
         self._http_client = None  # clickhouse_connect client
+        # Connected clones kept for reuse by checkout_clone()
+        self._spare_clones: list["CHClient"] = []
+        self._spare_lock = threading.Lock()
+        # Set under _spare_lock by disconnect(), so a clone checked in while
+        # the driver handles are being closed is not kept as a spare
+        self._closing = False
+
+    def clone(self) -> "CHClient":
+        """Return a new, not yet connected client for the same server."""
+        return CHClient(self._config)
+
+    def checkout_clone(self) -> "CHClient":
+        """Return a connected clone for running a query alongside this client.
+
+        Clones handed back with checkin_clone() are reused, so repeated
+        parallel lookups don't pay for a new connection every time.
+        """
+        with self._spare_lock:
+            if self._spare_clones:
+                return self._spare_clones.pop()
+        clone = self.clone()
+        clone.connect()
+        return clone
+
+    def checkin_clone(self, clone: "CHClient", healthy: bool = True):
+        """Give back a clone from checkout_clone(); unhealthy ones are closed."""
+        with self._spare_lock:
+            if healthy and not self._closing and self.connected:
+                self._spare_clones.append(clone)
+                return
+        clone.disconnect()
 
     @property
     def _use_http(self) -> bool:
@@ -46,6 +127,8 @@ class CHClient:
             self._config.host, self._config.port,
             self._config.protocol, self._config.secure,
         )
+        with self._spare_lock:
+            self._closing = False
         if self._use_http:
             self._connect_http()
         else:
@@ -67,12 +150,16 @@ class CHClient:
             password=self._config.password,
             connect_timeout=10,
             send_receive_timeout=30,
+            compression="lz4",
+            settings=NATIVE_SETTINGS,
         )
         if self._config.secure:
             kwargs["secure"] = True
             if self._config.ca_cert:
                 kwargs["ca_certs"] = self._config.ca_cert
         self._log_params(kwargs, "Native connection")
+        from clickhouse_driver import Client as NativeClient
+
         self._native_client = NativeClient(**kwargs)
         self._native_client.execute("SELECT 1")
 
@@ -84,6 +171,8 @@ class CHClient:
             password=self._config.password,
             connect_timeout=10,
             send_receive_timeout=30,
+            compress="lz4",
+            query_retries=2,
         )
         if self._config.secure:
             kwargs["secure"] = True
@@ -93,10 +182,17 @@ class CHClient:
             else:
                 kwargs["verify"] = False
         self._log_params(kwargs, "HTTP connection")
+        import clickhouse_connect
+
         self._http_client = clickhouse_connect.get_client(**kwargs)
         self._http_client.query("SELECT 1")
 
     def disconnect(self):
+        with self._spare_lock:
+            self._closing = True
+            spares, self._spare_clones = self._spare_clones, []
+        for clone in spares:
+            clone.disconnect()
         if self._native_client:
             self._native_client.disconnect()
             self._native_client = None
@@ -113,29 +209,92 @@ class CHClient:
                 max_rows: int | None = None) -> list[dict]:
         if not self.connected:
             raise RuntimeError("Not connected to ClickHouse")
-        logger.debug("Executing: %.200s | params=%s", query.strip(), params)
+        # Guarded so query.strip() is skipped when debug logging is off
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Executing: %.200s | params=%s", query.strip(), params)
         start = time.monotonic()
-        if self._http_client:
+        if max_rows:
+            # Stream so rows beyond the limit are never decoded
+            rows = list(self.execute_iter(query, params, max_rows=max_rows))
+        elif self._http_client:
             rows = self._execute_http(query, params)
         else:
             rows = self._execute_native(query, params)
         elapsed = time.monotonic() - start
-        if max_rows and len(rows) > max_rows:
-            logger.warning("Result truncated: %d rows -> %d (max_rows limit)", len(rows), max_rows)
-            rows = rows[:max_rows]
         logger.debug("Query OK: %.2fs, %d rows", elapsed, len(rows))
         return rows
 
+    def execute_iter(self, query: str, params: dict | None = None,
+                     max_rows: int | None = None) -> Iterator[dict]:
+        """Yield result rows one by one without buffering the whole result.
+
+        When *max_rows* is reached the remainder of the result is cancelled
+        instead of being transferred and decoded.
+        """
+        if not self.connected:
+            raise RuntimeError("Not connected to ClickHouse")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Streaming: %.200s | params=%s", query.strip(), params)
+        if self._http_client:
+            rows = self._iter_http(query, params)
+        else:
+            rows = self._iter_native(query, params)
+        try:
+            for count, row in enumerate(rows):
+                if max_rows and count >= max_rows:
+                    logger.warning("Result truncated at %d rows (max_rows limit)", max_rows)
+                    break
+                yield row
+        finally:
+            rows.close()
+
+    def execute_columnar(self, query: str, params: dict | None = None) -> dict[str, list]:
+        """Execute a query and return ``{column_name: values}`` without building per-row objects."""
+        if not self.connected:
+            raise RuntimeError("Not connected to ClickHouse")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Executing (columnar): %.200s | params=%s", query.strip(), params)
+        if self._http_client:
+            result = self._http_client.query(substitute_params(query, params))
+            col_names, data = result.column_names, result.result_columns
+        else:
+            data, columns = self._native_client.execute(
+                query, params or {}, with_column_types=True, columnar=True,
+            )
+            col_names = tuple(c[0] for c in columns)
+        if not data:
+            return {name: [] for name in col_names}
+        return {name: list(values) for name, values in zip(col_names, data)}
+
     def _execute_native(self, query: str, params: dict | None) -> list[dict]:
         result = self._native_client.execute(query, params or {}, with_column_types=True)
         data, columns = result
-        col_names = [c[0] for c in columns]
-        return [dict(zip(col_names, row)) for row in data]
+        return _rows_to_dicts(tuple(c[0] for c in columns), data)
+
+    def _iter_native(self, query: str, params: dict | None) -> Iterator[dict]:
+        it = self._native_client.execute_iter(query, params or {}, with_column_types=True)
+        # First item of a with_column_types stream is the column header
+        columns = next(it, None)
+        if columns is None:
+            return
+        col_names = tuple(c[0] for c in columns)
+        finished = False
+        try:
+            yield from map(dict, map(zip, repeat(col_names), it))
+            finished = True
+        finally:
+            if not finished:
+                # Drain the connection so it can be reused for the next query
+                it.close()
+                self._native_client.cancel()
 
     def _execute_http(self, query: str, params: dict | None) -> list[dict]:
-        if params:
-            escaped = {k: _escape_value(v) for k, v in params.items()}
-            query = query % escaped
+        query = substitute_params(query, params)
         result = self._http_client.query(query)
-        col_names = result.column_names
-        return [dict(zip(col_names, row)) for row in result.result_rows]
+        return _rows_to_dicts(tuple(result.column_names), result.result_rows)
+
+    def _iter_http(self, query: str, params: dict | None) -> Iterator[dict]:
+        query = substitute_params(query, params)
+        with self._http_client.query_rows_stream(query) as stream:
+            col_names = tuple(stream.source.column_names)
+            yield from map(dict, map(zip, repeat(col_names), stream))
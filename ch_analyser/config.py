@@ -1,14 +1,18 @@
 import os
 import re
+import stat
+import tempfile
+from contextlib import contextmanager
 from dataclasses import dataclass, field
-from dotenv import dotenv_values
 
+from ch_analyser import env_cache
 from ch_analyser.logging_config import get_logger
 
 logger = get_logger(__name__)
 
 CONN_PREFIX = "CLICKHOUSE_CONNECTION_"
 CONN_PATTERN = re.compile(r"^CLICKHOUSE_CONNECTION_(\d+)_(.+)$")
+DEFAULT_PORT = 9000
 FIELDS = ("NAME", "HOST", "PORT", "USER", "PASSWORD", "PROTOCOL", "SECURE", "QMON_ALIAS")
 
 APP_SETTING_PREFIX = "APP_SETTING_"
@@ -27,7 +31,7 @@ APP_SETTINGS_DEFAULTS = {
 class ConnectionConfig:
     name: str
     host: str
-    port: int = 9000
+    port: int = DEFAULT_PORT
     user: str = "default"
     password: str = ""
     protocol: str = "native"   # "native" | "http"
@@ -40,87 +44,122 @@ class ConnectionManager:
     def __init__(self, env_path: str = ".env"):
         self._env_path = env_path
         self._connections: dict[int, ConnectionConfig] = {}
+        self._by_name: dict[str, int] = {}
+        self._max_idx = 0
+        # Non-connection lines of .env, keyed by the file's (mtime_ns, size)
+        self._other_lines: list[str] = []
+        self._other_lines_key: tuple[int, int] | None = None
+        self._batch_depth = 0
+        self._dirty = False
         self._load()
 
     def _load(self):
         self._connections.clear()
+        self._by_name.clear()
+        self._max_idx = 0
         if not os.path.exists(self._env_path):
             return
 
-        values = dotenv_values(self._env_path)
-        indices: dict[int, dict[str, str]] = {}
-
-        for key, val in values.items():
-            m = CONN_PATTERN.match(key)
-            if m:
-                idx = int(m.group(1))
-                field_name = m.group(2)
-                indices.setdefault(idx, {})[field_name] = val or ""
-
+        values = env_cache.load_env(self._env_path)
+        indices = env_cache.parse_indexed(values, CONN_PREFIX, CONN_PATTERN)
         for idx in sorted(indices):
             data = indices[idx]
             if "NAME" not in data or "HOST" not in data:
                 continue
+            port = data.get("PORT")
             self._connections[idx] = ConnectionConfig(
-                name=data.get("NAME", ""),
-                host=data.get("HOST", "localhost"),
-                port=int(data.get("PORT", "9000")),
+                name=data["NAME"],
+                host=data["HOST"],
+                port=int(port) if port else DEFAULT_PORT,
                 user=data.get("USER", "default"),
                 password=data.get("PASSWORD", ""),
                 protocol=data.get("PROTOCOL", "native"),
                 secure=data.get("SECURE", "false").lower() == "true",
                 qmon_alias=data.get("QMON_ALIAS", ""),
             )
+        self._max_idx = max(self._connections, default=0)
+        self._rebuild_name_index()
+
+    def _rebuild_name_index(self):
+        # Iterate in reverse so the lowest index wins for duplicate names
+        self._by_name = {cfg.name: idx for idx, cfg in reversed(self._connections.items())}
 
     @property
     def ca_cert(self) -> str:
         """Global CA certificate path from CLICKHOUSE_CA_CERT in .env."""
-        values = dotenv_values(self._env_path)
+        if not os.path.exists(self._env_path):
+            return ""
+        values = env_cache.load_env(self._env_path)
         return values.get("CLICKHOUSE_CA_CERT", "")
 
     def list_connections(self) -> list[ConnectionConfig]:
         return [self._connections[k] for k in sorted(self._connections)]
 
     def get_connection(self, name: str) -> ConnectionConfig | None:
-        for cfg in self._connections.values():
-            if cfg.name == name:
-                return cfg
-        return None
+        idx = self._by_name.get(name)
+        return self._connections[idx] if idx is not None else None
 
     def add_connection(self, cfg: ConnectionConfig):
-        next_idx = max(self._connections.keys(), default=0) + 1
-        self._connections[next_idx] = cfg
-        self._persist()
+        self._max_idx += 1
+        self._connections[self._max_idx] = cfg
+        self._save()
         logger.info("Added connection: %s", cfg.name)
 
     def update_connection(self, old_name: str, cfg: ConnectionConfig):
-        for idx, existing in self._connections.items():
-            if existing.name == old_name:
-                self._connections[idx] = cfg
-                self._persist()
-                logger.info("Updated connection: %s -> %s", old_name, cfg.name)
-                return
-        raise ValueError(f"Connection '{old_name}' not found")
+        idx = self._by_name.get(old_name)
+        if idx is None:
+            raise ValueError(f"Connection '{old_name}' not found")
+        self._connections[idx] = cfg
+        self._save()
+        logger.info("Updated connection: %s -> %s", old_name, cfg.name)
 
     def delete_connection(self, name: str):
-        for idx, existing in list(self._connections.items()):
-            if existing.name == name:
-                del self._connections[idx]
+        idx = self._by_name.get(name)
+        if idx is None:
+            raise ValueError(f"Connection '{name}' not found")
+        del self._connections[idx]
+        self._save()
+        logger.info("Deleted connection: %s", name)
+
+    @contextmanager
+    def batch(self):
+        """Group several mutations into a single write of the .env file."""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._dirty:
                 self._persist()
-                logger.info("Deleted connection: %s", name)
-                return
-        raise ValueError(f"Connection '{name}' not found")
 
-    def _persist(self):
-        # Read existing non-CLICKHOUSE lines
-        other_lines = []
-        if os.path.exists(self._env_path):
+    def _save(self):
+        if self._batch_depth:
+            self._dirty = True
+            self._rebuild_name_index()
+        else:
+            self._persist()
+
+    def _read_other_lines(self) -> list[str]:
+        """Return non-connection lines of .env, re-reading only if the file changed."""
+        try:
+            st = os.stat(self._env_path)
+        except FileNotFoundError:
+            return []
+        key = (st.st_mtime_ns, st.st_size)
+        if key != self._other_lines_key:
+            other_lines = []
             with open(self._env_path, "r") as f:
                 for line in f:
                     stripped = line.strip()
                     if stripped and not stripped.startswith("#") and CONN_PATTERN.match(stripped.split("=")[0]):
                         continue
                     other_lines.append(line)
+            self._other_lines = other_lines
+            self._other_lines_key = key
+        return self._other_lines
+
+    def _persist(self):
+        other_lines = self._read_other_lines()
 
         # Reindex connections starting from 1
         reindexed: dict[int, ConnectionConfig] = {}
@@ -129,21 +168,44 @@ class ConnectionManager:
         ):
             reindexed[new_idx] = cfg
         self._connections = reindexed
-
-        with open(self._env_path, "w") as f:
-            for line in other_lines:
-                f.write(line)
-
-            for idx, cfg in sorted(self._connections.items()):
-                prefix = f"{CONN_PREFIX}{idx}_"
-                f.write(f"{prefix}NAME={cfg.name}\n")
-                f.write(f"{prefix}HOST={cfg.host}\n")
-                f.write(f"{prefix}PORT={cfg.port}\n")
-                f.write(f"{prefix}USER={cfg.user}\n")
-                f.write(f"{prefix}PASSWORD={cfg.password}\n")
-                f.write(f"{prefix}PROTOCOL={cfg.protocol}\n")
-                f.write(f"{prefix}SECURE={str(cfg.secure).lower()}\n")
-                f.write(f"{prefix}QMON_ALIAS={cfg.qmon_alias}\n")
+        self._max_idx = len(reindexed)
+        self._rebuild_name_index()
+
+        # Write to a temp file and swap it in so readers never see a partial .env.
+        # mkstemp creates it 0600 next to the .env; an existing file's mode
+        # (it holds passwords) is carried over to the replacement.
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(self._env_path) or ".", prefix=".env.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                if os.path.exists(self._env_path):
+                    os.chmod(tmp_path, stat.S_IMODE(os.stat(self._env_path).st_mode))
+                for line in other_lines:
+                    f.write(line)
+
+                for idx, cfg in sorted(self._connections.items()):
+                    prefix = f"{CONN_PREFIX}{idx}_"
+                    f.write(f"{prefix}NAME={cfg.name}\n")
+                    f.write(f"{prefix}HOST={cfg.host}\n")
+                    f.write(f"{prefix}PORT={cfg.port}\n")
+                    f.write(f"{prefix}USER={cfg.user}\n")
+                    f.write(f"{prefix}PASSWORD={cfg.password}\n")
+                    f.write(f"{prefix}PROTOCOL={cfg.protocol}\n")
+                    f.write(f"{prefix}SECURE={str(cfg.secure).lower()}\n")
+                    f.write(f"{prefix}QMON_ALIAS={cfg.qmon_alias}\n")
+            os.replace(tmp_path, self._env_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        env_cache.invalidate(self._env_path)
+
+        st = os.stat(self._env_path)
+        self._other_lines_key = (st.st_mtime_ns, st.st_size)
+        self._dirty = False
 
 
 class AppSettingsManager:
@@ -156,7 +218,7 @@ class AppSettingsManager:
         fallback = APP_SETTINGS_DEFAULTS.get(key, default or "")
         if not os.path.exists(self._env_path):
             return fallback
-        values = dotenv_values(self._env_path)
+        values = env_cache.load_env(self._env_path)
         return values.get(f"{APP_SETTING_PREFIX}{key}", fallback)
 
     def get_int(self, key: str, default: int = 0) -> int:
@@ -183,4 +245,5 @@ class AppSettingsManager:
         with open(self._env_path, "w") as f:
             for line in other_lines:
                 f.write(line)
+        env_cache.invalidate(self._env_path)
         logger.info("App setting %s = %s", key, value)
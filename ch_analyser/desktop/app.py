@@ -1,4 +1,5 @@
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk
 
 from ch_analyser.config import ConnectionManager
@@ -24,6 +25,8 @@ class App(tk.Tk):
         self.conn_manager = ConnectionManager()
         self.client: CHClient | None = None
         self.service: AnalysisService | None = None
+        # Single worker: ClickHouse calls run off the Tk thread, one at a time
+        self.executor = ThreadPoolExecutor(max_workers=1)
 
         # Configure ttk style
         style = ttk.Style(self)
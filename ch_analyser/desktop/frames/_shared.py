@@ -0,0 +1,100 @@
+"""Helpers shared by the desktop frames."""
+
+from concurrent.futures import Executor
+from tkinter import ttk
+
+INSERT_CHUNK_SIZE = 500
+POLL_INTERVAL_MS = 50
+
+
+def insert_rows(tree: ttk.Treeview, rows, iids=None) -> None:
+    """Append *rows* (sequences of column values) to the end of *tree*.
+
+    All inserts run inside a single Tcl ``foreach`` loop, so N rows cost one
+    Python -> Tcl round trip instead of N. Optional *iids* supplies the item
+    id for each row.
+    """
+    if iids is None:
+        tree.tk.call(
+            "foreach", "_row_values", tuple(map(tuple, rows)),
+            f"{tree} insert {{}} end -values $_row_values",
+        )
+    else:
+        flat = []
+        for iid, values in zip(iids, rows):
+            flat.append(iid)
+            flat.append(tuple(values))
+        tree.tk.call(
+            "foreach", ("_row_iid", "_row_values"), tuple(flat),
+            f"{tree} insert {{}} end -id $_row_iid -values $_row_values",
+        )
+
+
+def reconcile_rows(tree: ttk.Treeview, state: dict, rows: dict,
+                   is_current=lambda: True) -> None:
+    """Update *tree* in place so it shows *rows* (``{iid: values}``) in order.
+
+    *state* mirrors what the tree currently holds and is kept in sync as
+    changes are applied, so only removed, changed and new rows cost Tcl
+    calls, and selection and scroll position survive a refresh. New rows are
+    inserted in ``INSERT_CHUNK_SIZE`` batches, yielding to Tk in between;
+    *is_current* is checked before every batch so a superseded load stops.
+    """
+    removed = [iid for iid in state if iid not in rows]
+    if removed:
+        tree.delete(*removed)
+        for iid in removed:
+            del state[iid]
+
+    added = []
+    for iid, values in rows.items():
+        prev = state.get(iid)
+        if prev is None:
+            added.append(iid)
+        elif prev != values:
+            tree.item(iid, values=values)
+            state[iid] = values
+
+    def _step(start: int):
+        if not is_current():
+            return
+        chunk = added[start:start + INSERT_CHUNK_SIZE]
+        if chunk:
+            insert_rows(tree, [rows[iid] for iid in chunk], chunk)
+            for iid in chunk:
+                state[iid] = rows[iid]
+        if start + INSERT_CHUNK_SIZE < len(added):
+            tree.after(0, _step, start + INSERT_CHUNK_SIZE)
+            return
+        order = tuple(rows)
+        if tree.get_children() != order:
+            tree.set_children("", *order)
+
+    _step(0)
+
+
+def clear_rows(tree: ttk.Treeview, state: dict) -> None:
+    """Remove every row from *tree* and reset its *state* mirror."""
+    tree.delete(*tree.get_children())
+    state.clear()
+
+
+def run_in_background(widget, executor: Executor, fn, on_success, on_error) -> None:
+    """Run *fn* on *executor* and deliver its outcome on the Tk main thread.
+
+    The future is polled with ``after()`` because Tk widgets must not be
+    touched from worker threads.
+    """
+    future = executor.submit(fn)
+
+    def _poll():
+        if not future.done():
+            widget.after(POLL_INTERVAL_MS, _poll)
+            return
+        exc = future.exception()
+        if exc is not None:
+            on_error(exc)
+        else:
+            on_success(future.result())
+
+    widget.after(POLL_INTERVAL_MS, _poll)
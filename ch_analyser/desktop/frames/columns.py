@@ -1,16 +1,22 @@
 import tkinter as tk
+from operator import itemgetter
 from tkinter import ttk, messagebox
 
 from ch_analyser.logging_config import get_logger
+from ch_analyser.desktop.frames._shared import clear_rows, reconcile_rows, run_in_background
 
 logger = get_logger(__name__)
 
+_COLUMN_VALUES = itemgetter("name", "type", "codec", "size")
+
 
 class ColumnsFrame(tk.Frame):
     def __init__(self, parent, app):
         super().__init__(parent)
         self.app = app
         self._table_name = ""
+        self._load_seq = 0
+        self._row_state: dict[str, tuple] = {}
 
         # --- Header ---
         header = ttk.Frame(self)
@@ -48,35 +54,58 @@ class ColumnsFrame(tk.Frame):
         btn_frame.pack(fill=tk.X, padx=12, pady=(4, 12))
 
         ttk.Button(btn_frame, text="Back", command=self._on_back).pack(side=tk.LEFT)
-        ttk.Button(btn_frame, text="Refresh", command=self._load_columns).pack(
+        ttk.Button(btn_frame, text="Refresh", command=self._on_refresh).pack(
             side=tk.LEFT, padx=8
         )
 
     def on_show(self, table_name: str = "", **kwargs):
-        if table_name:
+        if table_name and table_name != self._table_name:
             self._table_name = table_name
+            clear_rows(self.tree, self._row_state)
         self._title_label.config(text=f"Columns  --  {self._table_name}")
         self._load_columns()
 
     def _load_columns(self):
         """Fetch columns for the current table and populate the treeview."""
-        self.tree.delete(*self.tree.get_children())
+        self._load_seq += 1
+        seq = self._load_seq
         if self.app.service is None:
+            clear_rows(self.tree, self._row_state)
             messagebox.showerror("Error", "Not connected to any database.")
             return
         if not self._table_name:
             return
 
-        try:
-            cols = self.app.service.get_columns(self._table_name)
-            for c in cols:
-                self.tree.insert(
-                    "", tk.END,
-                    values=(c["name"], c["type"], c.get("codec", ""), c.get("size", "")),
-                )
-        except Exception as exc:
-            logger.error("Failed to load columns for %s: %s", self._table_name, exc)
-            messagebox.showerror("Error", f"Failed to load columns:\n{exc}")
+        service = self.app.service
+        table_name = self._table_name
+        run_in_background(
+            self, self.app.executor,
+            lambda: service.get_columns(table_name),
+            lambda cols: self._on_columns_loaded(seq, cols),
+            lambda exc: self._on_load_error(seq, table_name, exc),
+        )
+
+    def _on_columns_loaded(self, seq: int, cols: list[dict]):
+        if seq != self._load_seq:
+            return
+        reconcile_rows(
+            self.tree, self._row_state,
+            {c["name"]: _COLUMN_VALUES(c) for c in cols},
+            is_current=lambda: seq == self._load_seq,
+        )
+
+    def _on_load_error(self, seq: int, table_name: str, exc: Exception):
+        if seq != self._load_seq:
+            return
+        logger.error("Failed to load columns for %s: %s", table_name, exc)
+        messagebox.showerror("Error", f"Failed to load columns:\n{exc}")
+
+    def _on_refresh(self):
+        if self.app.service is not None:
+            self.app.service.invalidate_cache()
+        self._load_columns()
 
     def _on_back(self):
+        # Drop the results of a load still in flight for this table
+        self._load_seq += 1
         self.app.show_frame("tables")
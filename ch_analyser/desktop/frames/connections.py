@@ -4,6 +4,7 @@ from tkinter import ttk, messagebox
 from ch_analyser.client import CHClient
 from ch_analyser.services import AnalysisService
 from ch_analyser.logging_config import get_logger
+from ch_analyser.desktop.frames._shared import clear_rows, reconcile_rows
 from ch_analyser.desktop.widgets.connection_dialog import ConnectionDialog
 
 logger = get_logger(__name__)
@@ -13,6 +14,7 @@ class ConnectionsFrame(tk.Frame):
     def __init__(self, parent, app):
         super().__init__(parent)
         self.app = app
+        self._row_state: dict[str, tuple] = {}
 
         # --- Header ---
         header = ttk.Frame(self)
@@ -59,15 +61,14 @@ class ConnectionsFrame(tk.Frame):
 
     def refresh(self):
         """Reload the connections list from the manager."""
-        self.tree.delete(*self.tree.get_children())
         try:
             connections = self.app.conn_manager.list_connections()
-            for cfg in connections:
-                self.tree.insert(
-                    "", tk.END, iid=cfg.name,
-                    values=(cfg.name, cfg.host, cfg.port, cfg.database),
-                )
+            reconcile_rows(self.tree, self._row_state, {
+                cfg.name: (cfg.name, cfg.host, cfg.port, cfg.database)
+                for cfg in connections
+            })
         except Exception as exc:
+            clear_rows(self.tree, self._row_state)
             logger.error("Failed to load connections: %s", exc)
             messagebox.showerror("Error", f"Failed to load connections:\n{exc}")
 
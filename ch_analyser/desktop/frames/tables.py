@@ -1,15 +1,22 @@
 import tkinter as tk
+from operator import attrgetter
 from tkinter import ttk, messagebox
 
 from ch_analyser.logging_config import get_logger
+from ch_analyser.services import TableRow
+from ch_analyser.desktop.frames._shared import clear_rows, reconcile_rows, run_in_background
 
 logger = get_logger(__name__)
 
+_TABLE_VALUES = attrgetter("name", "size", "last_select", "last_insert")
+
 
 class TablesFrame(tk.Frame):
     def __init__(self, parent, app):
         super().__init__(parent)
         self.app = app
+        self._load_seq = 0
+        self._row_state: dict[str, tuple] = {}
 
         # --- Header ---
         header = ttk.Frame(self)
@@ -50,7 +57,7 @@ class TablesFrame(tk.Frame):
         ttk.Button(btn_frame, text="Disconnect", command=self._on_disconnect).pack(
             side=tk.LEFT, padx=(0, 4)
         )
-        ttk.Button(btn_frame, text="Refresh", command=self._load_tables).pack(
+        ttk.Button(btn_frame, text="Refresh", command=self._on_refresh).pack(
             side=tk.LEFT, padx=4
         )
         ttk.Button(btn_frame, text="Details", command=self._on_details).pack(side=tk.RIGHT)
@@ -60,21 +67,38 @@ class TablesFrame(tk.Frame):
 
     def _load_tables(self):
         """Fetch tables from the analysis service and populate the treeview."""
-        self.tree.delete(*self.tree.get_children())
+        self._load_seq += 1
+        seq = self._load_seq
         if self.app.service is None:
+            clear_rows(self.tree, self._row_state)
             messagebox.showerror("Error", "Not connected to any database.")
             return
 
-        try:
-            tables = self.app.service.get_tables()
-            for t in tables:
-                self.tree.insert(
-                    "", tk.END, iid=t["name"],
-                    values=(t["name"], t["size"], t["last_select"], t["last_insert"]),
-                )
-        except Exception as exc:
-            logger.error("Failed to load tables: %s", exc)
-            messagebox.showerror("Error", f"Failed to load tables:\n{exc}")
+        run_in_background(
+            self, self.app.executor, self.app.service.get_tables,
+            lambda tables: self._on_tables_loaded(seq, tables),
+            lambda exc: self._on_load_error(seq, exc),
+        )
+
+    def _on_tables_loaded(self, seq: int, tables: list[TableRow]):
+        if seq != self._load_seq:
+            return
+        reconcile_rows(
+            self.tree, self._row_state,
+            {t.name: _TABLE_VALUES(t) for t in tables},
+            is_current=lambda: seq == self._load_seq,
+        )
+
+    def _on_load_error(self, seq: int, exc: Exception):
+        if seq != self._load_seq:
+            return
+        logger.error("Failed to load tables: %s", exc)
+        messagebox.showerror("Error", f"Failed to load tables:\n{exc}")
+
+    def _on_refresh(self):
+        if self.app.service is not None:
+            self.app.service.invalidate_cache()
+        self._load_tables()
 
     def _on_details(self):
         selection = self.tree.selection()
@@ -85,8 +109,12 @@ class TablesFrame(tk.Frame):
         self.app.show_frame("columns", table_name=table_name)
 
     def _on_disconnect(self):
+        if self.app.service is not None:
+            self.app.service.invalidate_cache()
         if self.app.client is not None and self.app.client.connected:
             self.app.client.disconnect()
         self.app.client = None
         self.app.service = None
+        self._load_seq += 1
+        clear_rows(self.tree, self._row_state)
         self.app.show_frame("connections")
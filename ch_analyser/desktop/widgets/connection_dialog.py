@@ -1,10 +1,10 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 
-from ch_analyser.config import ConnectionConfig
+from ch_analyser.config import DEFAULT_PORT, ConnectionConfig
 
 PORT_DEFAULTS = {
-    ("native", False): 9000,
+    ("native", False): DEFAULT_PORT,
     ("native", True): 9440,
     ("http", False): 8123,
     ("http", True): 8443,
@@ -80,17 +80,12 @@ class ConnectionDialog(tk.Toplevel):
 
         form.columnconfigure(1, weight=1)
 
-        # Auto-update port on protocol/SSL change
-        def _update_port(*_args):
-            proto = protocol_combo.get()
-            secure = self._ssl_var.get()
-            new_port = PORT_DEFAULTS.get((proto, secure), 9000)
-            port_entry = self._entries["port"]
-            port_entry.delete(0, tk.END)
-            port_entry.insert(0, str(new_port))
-
-        protocol_combo.bind("<<ComboboxSelected>>", _update_port)
-        self._ssl_var.trace_add("write", _update_port)
+        # Auto-update port on protocol/SSL change, until the user types one
+        self._port_user_edited = False
+        self._entries["port"].bind("<Key>", self._on_port_key)
+        protocol_combo.bind("<<ComboboxSelected>>", self._update_port)
+        self._ssl_trace_id = self._ssl_var.trace_add("write", self._update_port)
+        self.bind("<Destroy>", self._on_destroy)
 
         # --- Buttons ---
         btn_frame = ttk.Frame(self, padding=(16, 0, 16, 16))
@@ -111,6 +106,27 @@ class ConnectionDialog(tk.Toplevel):
         # Wait for the dialog to close
         self.wait_window()
 
+    def _on_port_key(self, event):
+        # Navigation keys (Tab, arrows, ...) have no char and don't edit the port
+        if event.char:
+            self._port_user_edited = True
+
+    def _update_port(self, *_args):
+        if self._port_user_edited:
+            return
+        proto = self._entries["protocol"].get()
+        new_port = str(PORT_DEFAULTS.get((proto, self._ssl_var.get()), DEFAULT_PORT))
+        port_entry = self._entries["port"]
+        if port_entry.get() != new_port:
+            port_entry.delete(0, tk.END)
+            port_entry.insert(0, new_port)
+
+    def _on_destroy(self, event):
+        # <Destroy> also fires for every child widget; detach the trace once
+        if event.widget is self and self._ssl_trace_id is not None:
+            self._ssl_var.trace_remove("write", self._ssl_trace_id)
+            self._ssl_trace_id = None
+
     def _on_ok(self):
         name = self._entries["name"].get().strip()
         host = self._entries["host"].get().strip()
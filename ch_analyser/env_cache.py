@@ -0,0 +1,49 @@
+"""Memoized .env parsing shared by all managers reading the same file."""
+
+import os
+import re
+
+from dotenv import dotenv_values
+
+_DOTENV_CACHE: dict[str, tuple[tuple[int, int], dict[str, str | None]]] = {}
+
+
+def load_env(path: str) -> dict[str, str | None]:
+    """Return parsed values of the .env file at *path*.
+
+    The file is re-parsed only when its mtime or size has changed since the
+    previous call. The returned dict is shared between callers and must not
+    be mutated. Entries are keyed by the resolved path, so managers opening
+    the same file under different relative paths share one parse.
+    """
+    real = os.path.realpath(path)
+    st = os.stat(real)
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _DOTENV_CACHE.get(real)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    values = dotenv_values(real)
+    _DOTENV_CACHE[real] = (key, values)
+    return values
+
+
+def invalidate(path: str) -> None:
+    """Drop the cached values for *path* (call after writing the file)."""
+    _DOTENV_CACHE.pop(os.path.realpath(path), None)
+
+
+def parse_indexed(values: dict[str, str | None], prefix: str,
+                  pattern: re.Pattern) -> dict[int, dict[str, str]]:
+    """Group ``<PREFIX><N>_<FIELD>`` keys into ``{N: {FIELD: value}}``.
+
+    *pattern* must capture the index and field name as groups 1 and 2.
+    Keys not starting with *prefix* are skipped without running the regex.
+    """
+    indices: dict[int, dict[str, str]] = {}
+    for key, val in values.items():
+        if not key.startswith(prefix):
+            continue
+        m = pattern.match(key)
+        if m:
+            indices.setdefault(int(m[1]), {})[m[2]] = val or ""
+    return indices
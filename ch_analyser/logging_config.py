@@ -1,15 +1,40 @@
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
+
+_listener: logging.handlers.QueueListener | None = None
 
 
 def setup_logging(level=None):
+    """Configure root logging.
+
+    Records are handed to a queue and written by a QueueListener thread, so
+    the event loop and UI threads never block on stream I/O.
+    """
+    global _listener
     if level is None:
         env_level = os.environ.get("LOG_LEVEL", "INFO").upper()
         level = getattr(logging, env_level, logging.INFO)
-    logging.basicConfig(
-        level=level,
-        format="[%(asctime)s] %(levelname)s %(name)s: %(message)s",
+    if _listener is not None:
+        logging.getLogger().setLevel(level)
+        return
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter("[%(asctime)s] %(levelname)s %(name)s: %(message)s")
     )
+    log_queue: queue.Queue = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # Only merge msg % args here; the listener's handler applies the real format
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    logging.basicConfig(level=level, handlers=[queue_handler])
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+    # Flush queued records on interpreter exit
+    atexit.register(_listener.stop)
 
 
 def get_logger(name: str) -> logging.Logger:
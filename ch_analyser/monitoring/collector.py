@@ -1,59 +1,136 @@
 """Collector — gathers monitoring data from all configured ClickHouse servers."""
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 from datetime import datetime
 
 from ch_analyser.client import CHClient
-from ch_analyser.config import ConnectionManager
+from ch_analyser.config import ConnectionConfig, ConnectionManager
 from ch_analyser.monitoring.store import MonitoringStore
 from ch_analyser.services import AnalysisService
 from ch_analyser.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+MAX_WORKERS = 8
+
 
 class Collector:
     def __init__(self, conn_manager: ConnectionManager, store: MonitoringStore):
         self._conn_manager = conn_manager
         self._store = store
+        # Long-lived clients reused across cycles, keyed by connection name
+        self._clients: dict[str, tuple[ConnectionConfig, CHClient]] = {}
+        # Services bound to those clients, so per-service caches survive too
+        self._services: dict[str, AnalysisService] = {}
 
     def collect_all(self) -> dict[str, str]:
         """Collect disk and table data from every configured connection.
 
-        Creates a temporary CHClient per connection (does not touch the user's
-        active connection in state.client).
+        Servers are polled concurrently, each through the collector's own
+        CHClient (does not touch the user's active connection in state.client).
 
         Returns dict mapping server_name -> status string.
         """
         results: dict[str, str] = {}
-        connections = self._conn_manager.list_connections()
-        if not connections:
-            logger.info("No connections configured, skipping collection")
+        configs = self._configs()
+        if not configs:
             return results
 
         ts = datetime.now()
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(configs))) as pool:
+            for name, status in pool.map(lambda cfg: self._collect_one(cfg, ts), configs):
+                results[name] = status
+
+        return results
+
+    async def collect_all_async(self) -> dict[str, str]:
+        """Async variant of collect_all for use from the event loop.
+
+        Each server is collected in its own worker thread and the results are
+        gathered on the loop, so no extra thread sits blocked waiting on a pool.
+        """
+        configs = self._configs()
+        if not configs:
+            return {}
+
+        ts = datetime.now()
+        pairs = await asyncio.gather(
+            *(asyncio.to_thread(self._collect_one, cfg, ts) for cfg in configs)
+        )
+        return dict(pairs)
+
+    def _configs(self) -> list[ConnectionConfig]:
+        connections = self._conn_manager.list_connections()
+        if not connections:
+            logger.info("No connections configured, skipping collection")
+            return []
         ca_cert = self._conn_manager.ca_cert
+        # Copy configs so worker threads never mutate the manager's objects
+        configs = [replace(cfg, ca_cert=ca_cert) for cfg in connections]
 
-        for cfg in connections:
-            try:
-                cfg.ca_cert = ca_cert
-                client = CHClient(cfg)
-                client.connect()
-                try:
-                    svc = AnalysisService(client)
-
-                    disks = svc.get_disk_usage_bytes()
-                    self._store.insert_server_disk(ts, cfg.name, disks)
-
-                    tables = svc.get_table_sizes_bytes()
-                    self._store.insert_table_sizes(ts, cfg.name, tables)
-
-                    results[cfg.name] = "ok"
-                    logger.info("Collected data from %s: %d disks, %d tables",
-                                cfg.name, len(disks), len(tables))
-                finally:
-                    client.disconnect()
-            except Exception as e:
-                results[cfg.name] = f"error: {e}"
-                logger.warning("Failed to collect from %s: %s", cfg.name, e)
+        # Forget clients of connections that were removed since the last cycle
+        names = {cfg.name for cfg in configs}
+        for name in [n for n in self._clients if n not in names]:
+            self._drop_client(name)
+        return configs
 
-        return results
+    def _service_for(self, cfg: ConnectionConfig) -> AnalysisService:
+        """Return the service for *cfg*, reusing the previous cycle's client and service."""
+        cached = self._clients.get(cfg.name)
+        if cached is not None:
+            if cached[0] == cfg:
+                return self._services[cfg.name]
+            # Connection settings were edited — reconnect with the new ones
+            self._drop_client(cfg.name)
+        client = CHClient(cfg)
+        client.connect()
+        self._clients[cfg.name] = (cfg, client)
+        svc = self._services[cfg.name] = AnalysisService(client)
+        return svc
+
+    def _drop_client(self, name: str):
+        self._services.pop(name, None)
+        cached = self._clients.pop(name, None)
+        if cached is None:
+            return
+        try:
+            cached[1].disconnect()
+        except Exception as e:
+            logger.debug("Error disconnecting monitoring client %s: %s", name, e)
+
+    def close(self):
+        """Disconnect all cached clients."""
+        for name in list(self._clients):
+            self._drop_client(name)
+
+    def _collect_one(self, cfg: ConnectionConfig, ts: datetime) -> tuple[str, str]:
+        try:
+            # Snapshots are hourly: skip queries whose result is already stored
+            # (e.g. after a restart within the same hour).
+            disks_done, tables_done = self._store.recorded_snapshots(ts, cfg.name)
+            if disks_done and tables_done:
+                logger.info("Snapshot for %s already recorded this hour", cfg.name)
+                return cfg.name, "ok"
+
+            svc = self._service_for(cfg)
+            disks: list[dict] = []
+            tables: list[dict] = []
+
+            if not disks_done:
+                disks = svc.get_disk_usage_bytes()
+                self._store.insert_server_disk(ts, cfg.name, disks)
+
+            if not tables_done:
+                tables = svc.get_table_sizes_bytes()
+                self._store.insert_table_sizes(ts, cfg.name, tables)
+
+            logger.info("Collected data from %s: %d disks, %d tables",
+                        cfg.name, len(disks), len(tables))
+            return cfg.name, "ok"
+        except Exception as e:
+            logger.warning("Failed to collect from %s: %s", cfg.name, e)
+            # Force a fresh connection next cycle
+            self._drop_client(cfg.name)
+            return cfg.name, f"error: {e}"
@@ -12,13 +12,14 @@ from ch_analyser.logging_config import get_logger
 logger = get_logger(__name__)
 
 _task: asyncio.Task | None = None
+_collector: Collector | None = None
 
 
 async def _collection_loop(collector: Collector, store: MonitoringStore, retention_days: int):
     """Run collection immediately, then every hour."""
     while True:
         try:
-            results = await run.io_bound(collector.collect_all)
+            results = await collector.collect_all_async()
             logger.info("Monitoring collection done: %s", results)
         except Exception as e:
             logger.error("Monitoring collection error: %s", e)
@@ -32,18 +33,21 @@ async def _collection_loop(collector: Collector, store: MonitoringStore, retenti
 
 
 def start_scheduler(conn_manager: ConnectionManager, store: MonitoringStore, retention_days: int = 365):
-    global _task
+    global _task, _collector
     if _task is not None:
         logger.warning("Scheduler already running")
         return
-    collector = Collector(conn_manager, store)
-    _task = asyncio.ensure_future(_collection_loop(collector, store, retention_days))
+    _collector = Collector(conn_manager, store)
+    _task = asyncio.ensure_future(_collection_loop(_collector, store, retention_days))
     logger.info("Monitoring scheduler started (retention=%d days)", retention_days)
 
 
 def stop_scheduler():
-    global _task
+    global _task, _collector
     if _task is not None:
         _task.cancel()
         _task = None
         logger.info("Monitoring scheduler stopped")
+    if _collector is not None:
+        _collector.close()
+        _collector = None
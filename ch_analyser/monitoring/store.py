@@ -1,8 +1,10 @@
 """MonitoringStore — DuckDB wrapper for monitoring snapshots."""
 
+import json
 import os
 import threading
-from datetime import datetime
+from datetime import datetime, timedelta
+from itertools import repeat
 
 import duckdb
 
@@ -10,27 +12,29 @@ from ch_analyser.logging_config import get_logger
 
 logger = get_logger(__name__)
 
-_SCHEMA_SQL = [
-    """
-    CREATE TABLE IF NOT EXISTS server_disk_snapshots (
+# `year` is a virtual generated column: computed from ts on read, never stored
+_TABLE_COLUMNS = {
+    "server_disk_snapshots": """
         ts          TIMESTAMP NOT NULL,
-        year        SMALLINT NOT NULL,
+        year        SMALLINT GENERATED ALWAYS AS (CAST(EXTRACT(YEAR FROM ts) AS SMALLINT)) VIRTUAL,
         server_name VARCHAR NOT NULL,
         disk_name   VARCHAR NOT NULL,
         total_bytes BIGINT NOT NULL,
         used_bytes  BIGINT NOT NULL
-    )
     """,
-    """
-    CREATE TABLE IF NOT EXISTS table_disk_snapshots (
+    "table_disk_snapshots": """
         ts              TIMESTAMP NOT NULL,
-        year            SMALLINT NOT NULL,
+        year            SMALLINT GENERATED ALWAYS AS (CAST(EXTRACT(YEAR FROM ts) AS SMALLINT)) VIRTUAL,
         server_name     VARCHAR NOT NULL,
         database_name   VARCHAR NOT NULL,
         table_name      VARCHAR NOT NULL,
         size_bytes      BIGINT NOT NULL
-    )
     """,
+}
+
+_SCHEMA_SQL = [
+    f"CREATE TABLE IF NOT EXISTS {table} ({columns})"
+    for table, columns in _TABLE_COLUMNS.items()
 ]
 
 _INDEX_SQL = [
@@ -39,20 +43,99 @@ _INDEX_SQL = [
 ]
 
 
+def _fetch_dicts(cur) -> list[dict]:
+    """Fetch all rows of the last query on *cur* as dicts keyed by column name.
+
+    Column names come from the cursor description, and the zip/dict
+    construction is driven by ``map`` so the per-row loop runs in C.
+    """
+    cols = tuple(d[0] for d in cur.description)
+    return list(map(dict, map(zip, repeat(cols), cur.fetchall())))
+
+
+# Snapshot column -> (key in the collector's row dicts, DuckDB type)
+_SERVER_DISK_FIELDS = {
+    "disk_name": ("name", "VARCHAR"),
+    "total_bytes": ("total_bytes", "BIGINT"),
+    "used_bytes": ("used_bytes", "BIGINT"),
+}
+_TABLE_SIZE_FIELDS = {
+    "database_name": ("database", "VARCHAR"),
+    "table_name": ("table", "VARCHAR"),
+    "size_bytes": ("size_bytes", "BIGINT"),
+}
+
+
+def _snapshot_insert_sql(table: str, fields: dict[str, tuple[str, str]]) -> str:
+    """Build the idempotent JSON-batch INSERT for a snapshot table.
+
+    Parameters: hour ts, server_name, rows as JSON, then server_name and
+    hour ts again for the existence guard.
+    """
+    spec = json.dumps([{src: typ for src, typ in fields.values()}])
+    names = ", ".join(fields)
+    values = ", ".join(f'r."{src}"' for src, _ in fields.values())
+    return (
+        f"INSERT INTO {table} (ts, server_name, {names}) "
+        f"SELECT ?, ?, {values} "
+        f"FROM (SELECT unnest(from_json(?, '{spec}')) AS r) "
+        f"WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE server_name = ? AND ts = ?)"
+    )
+
+
+# Built once at import instead of on every insert
+_INSERT_SERVER_DISK_SQL = _snapshot_insert_sql("server_disk_snapshots", _SERVER_DISK_FIELDS)
+_INSERT_TABLE_SIZES_SQL = _snapshot_insert_sql("table_disk_snapshots", _TABLE_SIZE_FIELDS)
+
+
 class MonitoringStore:
     def __init__(self, db_path: str = "data/monitoring.duckdb"):
         os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        # Serializes writers only; every method runs on its own cursor, so
+        # dashboard reads do not wait behind the hourly collection.
         self._lock = threading.Lock()
         self._conn = duckdb.connect(db_path)
         self._init_schema()
         logger.info("MonitoringStore opened: %s", db_path)
 
     def _init_schema(self):
+        # One multi-statement call instead of a round trip per DDL statement
         with self._lock:
-            for sql in _SCHEMA_SQL:
-                self._conn.execute(sql)
-            for sql in _INDEX_SQL:
-                self._conn.execute(sql)
+            self._conn.execute(";\n".join(_SCHEMA_SQL))
+            self._migrate_stored_year()
+            self._conn.execute(";\n".join(_INDEX_SQL))
+
+    def _migrate_stored_year(self):
+        """Rebuild tables created before `year` became a generated column.
+
+        DuckDB can neither add a generated column to an existing table nor
+        drop a column that an index depends on, so the table is copied into
+        a fresh one with the current schema. Indexes are recreated afterwards
+        by _INDEX_SQL.
+        """
+        stale = [r[0] for r in self._conn.execute("""
+            SELECT table_name FROM duckdb_columns()
+            WHERE column_name = 'year' AND column_default IS NULL
+              AND table_name IN (SELECT unnest(?))
+        """, [list(_TABLE_COLUMNS)]).fetchall()]
+        for table in stale:
+            columns = [r[0] for r in self._conn.execute(
+                "SELECT column_name FROM duckdb_columns() "
+                "WHERE table_name = ? AND column_name != 'year' ORDER BY column_index",
+                [table],
+            ).fetchall()]
+            cols = ", ".join(columns)
+            self._conn.execute("BEGIN TRANSACTION")
+            try:
+                self._conn.execute(f"CREATE TABLE {table}__new ({_TABLE_COLUMNS[table]})")
+                self._conn.execute(f"INSERT INTO {table}__new ({cols}) SELECT {cols} FROM {table}")
+                self._conn.execute(f"DROP TABLE {table}")
+                self._conn.execute(f"ALTER TABLE {table}__new RENAME TO {table}")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            logger.info("Migrated %s: year is now a generated column", table)
 
     def close(self):
         with self._lock:
@@ -61,48 +144,45 @@ class MonitoringStore:
 
     # ── Insert (idempotent — skip if hour already recorded) ──
 
-    def insert_server_disk(self, ts: datetime, server_name: str, disks: list[dict]):
+    def _insert_snapshot(self, sql: str, ts: datetime, server_name: str, rows: list[dict]):
+        """Insert one snapshot unless (server_name, hour) is already recorded.
+
+        *rows* go to DuckDB as a single JSON document that ``from_json``
+        decodes straight into typed columns, so there is no per-row or
+        per-value conversion in Python. Binding Python lists costs a
+        DuckDB Value per element and is two orders of magnitude slower.
+        """
         hour_ts = ts.replace(minute=0, second=0, microsecond=0)
-        year = hour_ts.year
-        with self._lock:
-            existing = self._conn.execute(
-                "SELECT 1 FROM server_disk_snapshots "
-                "WHERE server_name = ? AND ts = ? LIMIT 1",
-                [server_name, hour_ts],
-            ).fetchone()
-            if existing:
-                return
-            for d in disks:
-                self._conn.execute(
-                    "INSERT INTO server_disk_snapshots (ts, year, server_name, disk_name, total_bytes, used_bytes) "
-                    "VALUES (?, ?, ?, ?, ?, ?)",
-                    [hour_ts, year, server_name, d["name"], d["total_bytes"], d["used_bytes"]],
-                )
+        params = [hour_ts, server_name, json.dumps(rows), server_name, hour_ts]
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute(sql, params)
 
-    def insert_table_sizes(self, ts: datetime, server_name: str, tables: list[dict]):
+    def recorded_snapshots(self, ts: datetime, server_name: str) -> tuple[bool, bool]:
+        """Whether (server disk, table sizes) snapshots exist for the hour of *ts*."""
         hour_ts = ts.replace(minute=0, second=0, microsecond=0)
-        year = hour_ts.year
-        with self._lock:
-            existing = self._conn.execute(
-                "SELECT 1 FROM table_disk_snapshots "
-                "WHERE server_name = ? AND ts = ? LIMIT 1",
-                [server_name, hour_ts],
-            ).fetchone()
-            if existing:
-                return
-            for t in tables:
-                self._conn.execute(
-                    "INSERT INTO table_disk_snapshots (ts, year, server_name, database_name, table_name, size_bytes) "
-                    "VALUES (?, ?, ?, ?, ?, ?)",
-                    [hour_ts, year, server_name, t["database"], t["table"], t["size_bytes"]],
-                )
+        with self._conn.cursor() as cur:
+            cur.execute("""
+                SELECT
+                    EXISTS (SELECT 1 FROM server_disk_snapshots WHERE server_name = ? AND ts = ?),
+                    EXISTS (SELECT 1 FROM table_disk_snapshots WHERE server_name = ? AND ts = ?)
+            """, [server_name, hour_ts, server_name, hour_ts])
+            disks_done, tables_done = cur.fetchone()
+            return disks_done, tables_done
+
+    def insert_server_disk(self, ts: datetime, server_name: str, disks: list[dict]):
+        if disks:
+            self._insert_snapshot(_INSERT_SERVER_DISK_SQL, ts, server_name, disks)
+
+    def insert_table_sizes(self, ts: datetime, server_name: str, tables: list[dict]):
+        if tables:
+            self._insert_snapshot(_INSERT_TABLE_SIZES_SQL, ts, server_name, tables)
 
     # ── Query (for dashboard) ──
 
     def get_server_disk_latest(self) -> list[dict]:
         """Last snapshot per server (across all disks summed)."""
-        with self._lock:
-            rows = self._conn.execute("""
+        with self._conn.cursor() as cur:
+            cur.execute("""
                 WITH latest AS (
                     SELECT server_name, max(ts) AS max_ts
                     FROM server_disk_snapshots
@@ -115,14 +195,13 @@ class MonitoringStore:
                 JOIN latest l ON s.server_name = l.server_name AND s.ts = l.max_ts
                 GROUP BY s.server_name, s.ts
                 ORDER BY s.server_name
-            """).fetchall()
-            cols = ["server_name", "ts", "total_bytes", "used_bytes"]
-            return [dict(zip(cols, r)) for r in rows]
+            """)
+            return _fetch_dicts(cur)
 
     def get_server_disk_history(self, days: int = 30) -> list[dict]:
         """Time series of disk usage per server (sum of all disks)."""
-        with self._lock:
-            rows = self._conn.execute(f"""
+        with self._conn.cursor() as cur:
+            cur.execute(f"""
                 SELECT server_name, ts,
                        sum(total_bytes) AS total_bytes,
                        sum(used_bytes) AS used_bytes
@@ -130,14 +209,13 @@ class MonitoringStore:
                 WHERE ts >= now() - INTERVAL '{int(days)} days'
                 GROUP BY server_name, ts
                 ORDER BY server_name, ts
-            """).fetchall()
-            cols = ["server_name", "ts", "total_bytes", "used_bytes"]
-            return [dict(zip(cols, r)) for r in rows]
+            """)
+            return _fetch_dicts(cur)
 
     def get_table_disk_latest(self, server_name: str) -> list[dict]:
         """Latest table sizes for a specific server."""
-        with self._lock:
-            rows = self._conn.execute("""
+        with self._conn.cursor() as cur:
+            cur.execute("""
                 WITH latest AS (
                     SELECT max(ts) AS max_ts
                     FROM table_disk_snapshots
@@ -148,61 +226,44 @@ class MonitoringStore:
                 JOIN latest l ON t.ts = l.max_ts
                 WHERE t.server_name = ?
                 ORDER BY size_bytes DESC
-            """, [server_name, server_name]).fetchall()
-            cols = ["database_name", "table_name", "size_bytes"]
-            return [dict(zip(cols, r)) for r in rows]
+            """, [server_name, server_name])
+            return _fetch_dicts(cur)
 
     def get_table_disk_history(self, server_name: str, days: int = 30, top_n: int = 30) -> list[dict]:
         """Time series of table sizes (top-N + 'other') for a server."""
-        with self._lock:
-            # Find top-N tables by latest snapshot
-            top_tables = self._conn.execute("""
-                WITH latest AS (
-                    SELECT max(ts) AS max_ts
+        with self._conn.cursor() as cur:
+            # Top-N tables by latest snapshot; everything else is summed into '__other__'
+            cur.execute("""
+                WITH top AS (
+                    SELECT database_name || '.' || table_name AS full_name
                     FROM table_disk_snapshots
                     WHERE server_name = ?
+                      AND ts = (SELECT max(ts) FROM table_disk_snapshots WHERE server_name = ?)
+                    ORDER BY size_bytes DESC
+                    LIMIT ?
                 )
-                SELECT database_name || '.' || table_name AS full_name
-                FROM table_disk_snapshots t
-                JOIN latest l ON t.ts = l.max_ts
-                WHERE t.server_name = ?
-                ORDER BY size_bytes DESC
-                LIMIT ?
-            """, [server_name, server_name, top_n]).fetchall()
-            top_names = {r[0] for r in top_tables}
-
-            rows = self._conn.execute(f"""
                 SELECT ts,
-                       database_name || '.' || table_name AS full_name,
-                       size_bytes
-                FROM table_disk_snapshots
-                WHERE server_name = ?
-                  AND ts >= now() - INTERVAL '{int(days)} days'
-                ORDER BY ts, full_name
-            """, [server_name]).fetchall()
-
-            # Group into top-N + other
-            result: list[dict] = []
-            other_by_ts: dict[str, int] = {}
-            for ts, full_name, size_bytes in rows:
-                ts_str = str(ts)
-                if full_name in top_names:
-                    result.append({"ts": ts, "table_name": full_name, "size_bytes": size_bytes})
-                else:
-                    other_by_ts[ts_str] = other_by_ts.get(ts_str, 0) + size_bytes
-
-            for ts_str, size in other_by_ts.items():
-                result.append({"ts": datetime.fromisoformat(ts_str), "table_name": "__other__", "size_bytes": size})
-
-            return result
+                       CASE WHEN full_name IN (SELECT full_name FROM top)
+                            THEN full_name ELSE '__other__' END AS table_name,
+                       sum(size_bytes) AS size_bytes
+                FROM (
+                    SELECT ts, database_name || '.' || table_name AS full_name, size_bytes
+                    FROM table_disk_snapshots
+                    WHERE server_name = ?
+                      AND ts >= now() - INTERVAL (?) DAY
+                ) x
+                GROUP BY ts, table_name
+                ORDER BY ts, table_name
+            """, [server_name, server_name, top_n, server_name, int(days)])
+            return _fetch_dicts(cur)
 
     # ── Rename ──
 
     def rename_server(self, old_name: str, new_name: str):
         """Rename server_name in all monitoring tables."""
-        with self._lock:
+        with self._lock, self._conn.cursor() as cur:
             for table in ("server_disk_snapshots", "table_disk_snapshots"):
-                self._conn.execute(
+                cur.execute(
                     f"UPDATE {table} SET server_name = ? WHERE server_name = ?",
                     [new_name, old_name],
                 )
@@ -212,9 +273,16 @@ class MonitoringStore:
 
     def cleanup_expired(self, retention_days: int = 365):
         """Delete snapshots older than retention_days."""
-        with self._lock:
-            for table in ("server_disk_snapshots", "table_disk_snapshots"):
-                self._conn.execute(
-                    f"DELETE FROM {table} WHERE ts < now() - INTERVAL '{int(retention_days)} days'",
-                )
+        # Snapshot timestamps are naive local time (see Collector), so the
+        # cutoff is computed the same way and bound as a literal.
+        cutoff = datetime.now() - timedelta(days=int(retention_days))
+        with self._lock, self._conn.cursor() as cur:
+            cur.execute("BEGIN TRANSACTION")
+            try:
+                for table in ("server_disk_snapshots", "table_disk_snapshots"):
+                    cur.execute(f"DELETE FROM {table} WHERE ts < ?", [cutoff])
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+            cur.execute("COMMIT")
         logger.info("Cleanup done (retention=%d days)", retention_days)
@@ -1,219 +1,510 @@
 import re
-
-from ch_analyser.client import CHClient
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+
+from ch_analyser.client import CHClient, substitute_params
 from ch_analyser.logging_config import get_logger
 
 logger = get_logger(__name__)
 
 EXCLUDED_DATABASES = ("system", "INFORMATION_SCHEMA", "information_schema",
                       "_temporary_and_external_tables")
+_EXCLUDED_PREFIXES = tuple(f"{db}." for db in EXCLUDED_DATABASES)
+# HAVING clause dropping excluded databases from arrayJoin(tables) results
+_EXCLUDED_TABLES_HAVING = " AND ".join(
+    f"NOT startsWith(table_name, '{prefix}')" for prefix in _EXCLUDED_PREFIXES
+)
 
 QUERY_LOG_DAYS_DEFAULT = 30
 
+# How long the system.tables DDL listing is reused between calls (seconds)
+DDL_CACHE_TTL = 30.0
+# How long system.disks results are reused between calls (seconds)
+DISK_INFO_CACHE_TTL = 30.0
+# How long table listings and reference lookups are reused (seconds)
+RESULT_CACHE_TTL = 10.0
+
+# TTL clause of a CREATE TABLE query (Python fallback for _TTL_EXTRACT_RE2)
+_TTL_RE = re.compile(
+    r'\bTTL\s+(.+?)(?=\s+(?:DELETE|TO\s+DISK|TO\s+VOLUME|RECOMPRESS|SETTINGS|ENGINE)\b|,|\Z)',
+    re.IGNORECASE | re.ASCII,
+)
+
+# TTL clause of a CREATE TABLE query, for ClickHouse's re2-based extract().
+# re2 has no lookahead, so the terminator is consumed instead; extract()
+# returns only the captured group. Backslashes are doubled for the SQL literal.
+_TTL_EXTRACT_RE2 = (
+    r"(?i)\\bTTL\\s+(.+?)"
+    r"(?:\\s+(?:DELETE|TO\\s+DISK|TO\\s+VOLUME|RECOMPRESS|SETTINGS|ENGINE)\\b|,|$)"
+)
+
+# DDL from one character before its first "TTL" on: nothing earlier can be
+# part of the clause, and the extra character keeps _TTL_RE's \b check intact.
+# UTF8 variants count code points, so the cut never splits a character.
+_TTL_TAIL_SQL = (
+    "substringUTF8(create_table_query, "
+    "greatest(positionCaseInsensitiveUTF8(create_table_query, 'TTL') - 1, 1))"
+)
+
+# Destination of an INSERT, for ClickHouse's re2-based extract().
+# query_log.tables also lists the tables an INSERT ... SELECT reads from,
+# so the target is taken from the query text instead. Backslashes are
+# doubled for the SQL literal.
+_INSERT_IDENT_RE2 = r'(?:`[^`]+`|"[^"]+"|[^\\s(.`"]+)'
+_INSERT_TARGET_RE2 = (
+    r"(?i)\\bINSERT\\s+INTO\\s+(?:TABLE\\s+)?"
+    rf"({_INSERT_IDENT_RE2}(?:\\.{_INSERT_IDENT_RE2})?)"
+)
+
+# Shared pool for running independent ClickHouse lookups concurrently
+_QUERY_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ch-query")
+
+
+def _last_insert_sqls(log_days: int) -> dict[str, str]:
+    """Last INSERT time per table from each log, keyed by log name.
+
+    Every query yields (table_name, last_insert) and expects the excluded
+    databases as ``%(excluded)s``.
+    """
+    return {
+        "part_log": (
+            "SELECT concat(database, '.', table) AS table_name, max(event_time) AS last_insert "
+            "FROM system.part_log "
+            "WHERE event_type = 'NewPart' AND database NOT IN %(excluded)s "
+            "GROUP BY database, table"
+        ),
+        # Only the INSERT destination (unquoted, qualified with the query's
+        # current database), not the tables it selects from
+        "query_log": (
+            "SELECT table_name, max(event_time) AS last_insert "
+            "FROM ("
+            "SELECT event_time, tables, "
+            f"replaceRegexpAll(extract(query, '{_INSERT_TARGET_RE2}'), '[`\"]', '') AS target, "
+            "if(position(target, '.') > 0, target, "
+            "concat(current_database, '.', target)) AS table_name "
+            "FROM system.query_log "
+            "WHERE type = 'QueryFinish' AND query_kind = 'Insert' "
+            f"AND event_date >= today() - {int(log_days)} "
+            f"AND event_time > now() - INTERVAL {int(log_days)} DAY"
+            ") "
+            "WHERE has(tables, table_name) "
+            "GROUP BY table_name "
+            f"HAVING {_EXCLUDED_TABLES_HAVING}"
+        ),
+        # Materialized views
+        "query_views_log": (
+            "SELECT database || '.' || view_name AS table_name, "
+            "max(event_time) AS last_insert "
+            "FROM system.query_views_log "
+            "WHERE view_type = 'Materialized' AND status = 'QueryFinish' "
+            "AND database NOT IN %(excluded)s "
+            "GROUP BY table_name"
+        ),
+    }
+
+
+def _max_last_insert_sql(*sqls: str) -> str:
+    """Combine per-log last INSERT queries, keeping the latest time per table."""
+    return (
+        "SELECT table_name, max(last_insert) AS last_insert "
+        f"FROM ({' UNION ALL '.join(sqls)}) "
+        "GROUP BY table_name"
+    )
+
 
 def _bfs(graph: dict[str, set[str]], start: str) -> set[str]:
     """Breadth-first search returning all reachable nodes from start."""
-    visited: set[str] = set()
-    queue = [start]
+    # Nodes are marked when enqueued, so each one enters the queue once
+    visited: set[str] = {start}
+    queue = deque([start])
     while queue:
-        node = queue.pop(0)
-        if node in visited:
-            continue
-        visited.add(node)
-        for neighbor in graph.get(node, []):
+        node = queue.popleft()
+        for neighbor in graph.get(node, ()):
             if neighbor not in visited:
+                visited.add(neighbor)
                 queue.append(neighbor)
     return visited
 
 
+def _result_or(future, default, what: str):
+    """Result of *future*, or *default* (with a warning) if it raised."""
+    try:
+        return future.result()
+    except Exception as e:
+        logger.warning("Failed to get %s: %s", what, e)
+        return default
+
+
+_WORD_RE = re.compile(r"\w+")
+
+# DDL / query parsing patterns used by the reference and flow lookups
+_DISTRIBUTED_RE = re.compile(
+    r"Distributed\s*\(\s*'[^']*'\s*,\s*'?([^',\s)]+)'?\s*,\s*'?([^',\s)]+)'?",
+    re.IGNORECASE,
+)
+_AS_SELECT_RE = re.compile(r'\bAS\s+SELECT\b', re.IGNORECASE)
+_FROM_RE = re.compile(r'\bFROM\s+(\w+(?:\.\w+)?)', re.IGNORECASE)
+_TO_RE = re.compile(r'\bTO\s+(\w+(?:\.\w+)?)', re.IGNORECASE)
+_INSERT_INTO_RE = re.compile(r'\bINSERT\s+INTO\s+(\S+)', re.IGNORECASE)
+
+
+@dataclass
+class _DdlNames:
+    """Identifiers found in one DDL, for O(1) reference lookups.
+
+    Mirrors the word-boundary patterns used for table references:
+    ``words`` holds every ``\\w+`` token, ``bare`` those not followed by a
+    dot, ``dotted`` every ``a.b`` pair, and the ``to_*`` sets (lowercased,
+    as TO matching is case-insensitive) the names following ``TO <space>``.
+    """
+    words: set[str] = field(default_factory=set)
+    bare: set[str] = field(default_factory=set)
+    dotted: set[str] = field(default_factory=set)
+    to_bare: set[str] = field(default_factory=set)
+    to_dotted: set[str] = field(default_factory=set)
+
+
+def _scan_ddl(ddl: str) -> _DdlNames:
+    """Tokenize *ddl* once so every candidate name is a set lookup.
+
+    Replaces compiling and running a regex per (target, DDL) pair.
+    """
+    names = _DdlNames()
+    tokens = [(m.group(), m.start(), m.end()) for m in _WORD_RE.finditer(ddl)]
+    end_of_ddl = len(ddl)
+    for i, (word, _start, end) in enumerate(tokens):
+        names.words.add(word)
+        nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+        dot_follows = end < end_of_ddl and ddl[end] == "."
+        if not dot_follows:
+            names.bare.add(word)
+        elif nxt is not None and nxt[1] == end + 1:
+            names.dotted.add(f"{word}.{nxt[0]}")
+
+        if nxt is not None and word.lower() == "to" and ddl[end:nxt[1]].isspace():
+            name, _, name_end = nxt
+            if name_end < end_of_ddl and ddl[name_end] == ".":
+                after = tokens[i + 2] if i + 2 < len(tokens) else None
+                if after is not None and after[1] == name_end + 1:
+                    names.to_dotted.add(f"{name}.{after[0]}".lower())
+            else:
+                names.to_bare.add(name.lower())
+    return names
+
+
+def _is_word(name: str) -> bool:
+    return _WORD_RE.fullmatch(name) is not None
+
+
+@dataclass(slots=True)
+class TableRow:
+    """One row of get_tables()."""
+    name: str
+    size: str
+    size_bytes: int
+    last_select: str
+    last_insert: str
+    replicated: bool
+    ttl: str
+
+
 class AnalysisService:
     def __init__(self, client: CHClient):
         self._client = client
+        # Per-instance cache: a service is bound to one connection
+        self._get_columns_cached = lru_cache(maxsize=128)(self._fetch_columns)
+        # Short-lived results: key -> (monotonic time stored, value)
+        self._ttl_cache: dict[tuple, tuple[float, object]] = {}
+
+    def invalidate_cache(self):
+        """Drop cached results (e.g. on an explicit refresh, after DDL changes or on disconnect)."""
+        self._get_columns_cached.cache_clear()
+        self._ttl_cache.clear()
+
+    def _cached(self, key: tuple, ttl: float, fetch, refresh: bool = False):
+        """Return ``fetch()``, reusing the value stored under *key* for *ttl* seconds.
+
+        *refresh* skips the stored value (e.g. on a Refresh button). Cached
+        values are shared between callers and must not be mutated.
+        """
+        now = time.monotonic()
+        hit = self._ttl_cache.get(key)
+        if not refresh and hit is not None and now - hit[0] < ttl:
+            return hit[1]
+        value = fetch()
+        self._ttl_cache[key] = (now, value)
+        return value
+
+    def _get_all_ddl(self) -> list[dict]:
+        """DDL of all non-system entities, reused for DDL_CACHE_TTL seconds.
+
+        Shared by the reference and flow lookups, which the UI calls
+        together. The returned rows must not be mutated.
+        """
+        return self._cached(("ddl",), DDL_CACHE_TTL, lambda: self._client.execute(
+            "SELECT database, name, engine, create_table_query "
+            "FROM system.tables "
+            "WHERE database NOT IN %(excluded)s",
+            {"excluded": list(EXCLUDED_DATABASES)},
+        ))
+
+    def _on_secondary_client(self, fn, *args):
+        """Run ``fn(client, *args)`` on an extra connection.
+
+        CHClient holds a single connection that must not be shared between
+        threads, so queries run in parallel with the main client each get
+        their own. Those connections are pooled on the main client and
+        closed with it.
+        """
+        client = self._client.checkout_clone()
+        try:
+            result = fn(client, *args)
+        except BaseException:
+            self._client.checkin_clone(client, healthy=False)
+            raise
+        self._client.checkin_clone(client)
+        return result
+
+    def get_tables(self, log_days: int = QUERY_LOG_DAYS_DEFAULT) -> list[TableRow]:
+        """Tables with sizes and last query times, reused for RESULT_CACHE_TTL seconds."""
+        return self._cached(("tables", log_days), RESULT_CACHE_TTL,
+                            lambda: self._fetch_tables(log_days))
 
-    def get_tables(self, log_days: int = QUERY_LOG_DAYS_DEFAULT) -> list[dict]:
+    def _fetch_tables(self, log_days: int) -> list[TableRow]:
         excluded = list(EXCLUDED_DATABASES)
 
-        # 1. Table sizes from system.parts (all databases except system ones)
-        sizes = {}
-        sizes_bytes = {}
+        # All lookups are independent: the main connection reads table sizes
+        # while the rest run concurrently, each on a secondary connection.
+        ttl_future = _QUERY_POOL.submit(
+            self._on_secondary_client, self._get_ttl_map, excluded)
+        selects_future = _QUERY_POOL.submit(
+            self._on_secondary_client, self._get_last_selects, log_days)
+        inserts_future = _QUERY_POOL.submit(
+            self._on_secondary_client, self._get_last_inserts, excluded, log_days)
+
         try:
-            rows = self._client.execute(
-                "SELECT database, table, "
-                "formatReadableSize(sum(bytes_on_disk)) AS size, "
-                "sum(bytes_on_disk) AS size_bytes "
-                "FROM system.parts "
-                "WHERE active AND database NOT IN %(excluded)s "
-                "GROUP BY database, table ORDER BY database, table",
-                {"excluded": excluded},
-            )
-            for r in rows:
-                key = f"{r['database']}.{r['table']}"
-                sizes[key] = r["size"]
-                sizes_bytes[key] = r["size_bytes"]
+            sizes, sizes_bytes, replicated = self._get_table_sizes(self._client, excluded)
         except Exception as e:
             logger.warning("Failed to get table sizes: %s", e)
-
-        # 2. Last SELECT per table from query_log
-        last_selects = {}
-        try:
-            rows = self._client.execute(
-                "SELECT arrayJoin(tables) AS table_name, max(event_time) AS last_select "
-                "FROM system.query_log "
-                "WHERE type = 'QueryFinish' AND query_kind = 'Select' "
-                f"AND event_time > now() - INTERVAL {int(log_days)} DAY "
-                "GROUP BY table_name "
-                "HAVING NOT startsWith(table_name, '_temporary_and_external_tables.')",
+            sizes, sizes_bytes, replicated = {}, {}, set()
+        ttl_map = _result_or(ttl_future, {}, "TTL info")
+        last_selects = _result_or(selects_future, {}, "last SELECT times")
+        last_inserts = _result_or(inserts_future, {}, "last INSERT times")
+
+        # Merge results (excluded databases are already filtered out by every query).
+        # sizes arrive largest first; tables without parts (size 0) go after
+        # them, so the list is already in display order.
+        extra = (last_selects.keys() | last_inserts.keys()) - sizes.keys()
+        all_tables = [*sizes, *extra]
+
+        result = [
+            TableRow(
+                name=table,
+                size=sizes.get(table, "0 B"),
+                size_bytes=sizes_bytes.get(table, 0),
+                last_select=last_selects.get(table, "-"),
+                last_insert=last_inserts.get(table, "-"),
+                replicated=table in replicated,
+                ttl=ttl_map.get(table, ""),
             )
-            for r in rows:
-                tname = r["table_name"]
-                last_selects[tname] = str(r["last_select"])
-        except Exception as e:
-            logger.warning("Failed to get last SELECT times: %s", e)
+            for table in all_tables
+        ]
+        return result
 
-        # 3. Last INSERT per table (prefer part_log, fallback query_log + query_views_log)
-        last_inserts = self._get_last_inserts(excluded, log_days=log_days)
+    @staticmethod
+    def _get_table_sizes(client: CHClient, excluded: list
+                         ) -> tuple[dict[str, str], dict[str, int], set[str]]:
+        """Readable and byte sizes per table from system.parts, and the
+        replicated tables (active on multiple replicas) among them.
 
-        # 4. Replicated tables (active on multiple replicas)
-        replicated = set()
+        system.replicas is joined into the same query; if it can't be read
+        (e.g. ZooKeeper trouble) sizes are fetched alone.
+        """
         try:
-            rows = self._client.execute(
-                "SELECT database, table FROM system.replicas "
-                "WHERE length(replica_is_active) > 1",
+            # Names come back already joined, and columnar: no per-row dicts
+            cols = client.execute_columnar(
+                "SELECT concat(p.database, '.', p.table) AS full_name, "
+                "formatReadableSize(sum(p.bytes_on_disk)) AS size, "
+                "sum(p.bytes_on_disk) AS size_bytes, "
+                "any(r.replicated) AS replicated "
+                "FROM system.parts AS p "
+                "LEFT JOIN ("
+                "SELECT database, table, length(replica_is_active) > 1 AS replicated "
+                "FROM system.replicas WHERE database NOT IN %(excluded)s"
+                ") AS r ON p.database = r.database AND p.table = r.table "
+                "WHERE p.active AND p.database NOT IN %(excluded)s "
+                "GROUP BY p.database, p.table ORDER BY size_bytes DESC",
+                {"excluded": excluded},
             )
-            for r in rows:
-                replicated.add(f"{r['database']}.{r['table']}")
+            replicated = {name for name, rep in zip(cols["full_name"], cols["replicated"]) if rep}
         except Exception as e:
             logger.warning("Failed to get replicated tables: %s", e)
-
-        # 5. DDL + TTL from system.tables
-        ttl_map: dict[str, str] = {}
-        try:
-            rows = self._client.execute(
-                "SELECT database, name, create_table_query "
-                "FROM system.tables "
-                "WHERE database NOT IN %(excluded)s",
+            cols = client.execute_columnar(
+                "SELECT concat(database, '.', table) AS full_name, "
+                "formatReadableSize(sum(bytes_on_disk)) AS size, "
+                "sum(bytes_on_disk) AS size_bytes "
+                "FROM system.parts "
+                "WHERE active AND database NOT IN %(excluded)s "
+                "GROUP BY database, table ORDER BY size_bytes DESC",
                 {"excluded": excluded},
             )
-            for r in rows:
-                ddl = r["create_table_query"] or ""
-                ttl_match = re.search(
-                    r'\bTTL\s+(.+?)(?=\s+(?:DELETE|TO\s+DISK|TO\s+VOLUME|RECOMPRESS|SETTINGS|ENGINE)\b|,|\Z)',
-                    ddl, re.IGNORECASE,
-                )
-                if ttl_match:
-                    full_name = f"{r['database']}.{r['name']}"
-                    ttl_map[full_name] = ttl_match.group(1).strip()
-        except Exception as e:
-            logger.warning("Failed to get TTL info: %s", e)
-
-        # Merge results
-        all_tables = set(sizes.keys()) | set(last_selects.keys()) | set(last_inserts.keys())
-        # Filter out system databases from query_log results too
-        all_tables = {t for t in all_tables if not any(t.startswith(f"{db}.") for db in EXCLUDED_DATABASES)}
-
-        result = []
-        for table in all_tables:
-            result.append({
-                "name": table,
-                "size": sizes.get(table, "0 B"),
-                "size_bytes": sizes_bytes.get(table, 0),
-                "last_select": last_selects.get(table, "-"),
-                "last_insert": last_inserts.get(table, "-"),
-                "replicated": table in replicated,
-                "ttl": ttl_map.get(table, ""),
-            })
-        result.sort(key=lambda t: t["size_bytes"], reverse=True)
-        return result
+            replicated = set()
+        names = cols["full_name"]
+        return dict(zip(names, cols["size"])), dict(zip(names, cols["size_bytes"])), replicated
 
-    def _get_last_inserts(self, excluded: list, log_days: int = QUERY_LOG_DAYS_DEFAULT) -> dict[str, str]:
-        """Get last insert time per table. Prefer part_log, fallback to query_log + query_views_log."""
-        result: dict[str, str] = {}
+    @staticmethod
+    def _get_ttl_map(client: CHClient, excluded: list) -> dict[str, str]:
+        """TTL expression per table, extracted from the DDL in system.tables.
 
-        # Try system.part_log first (most reliable)
-        try:
-            rows = self._client.execute(
-                "SELECT database, table, max(event_time) AS last_insert "
-                "FROM system.part_log "
-                "WHERE event_type = 'NewPart' AND database NOT IN %(excluded)s "
-                "GROUP BY database, table",
-                {"excluded": excluded},
-            )
-            for r in rows:
-                result[f"{r['database']}.{r['table']}"] = str(r["last_insert"])
-            return result
-        except Exception:
-            pass  # part_log not enabled, fallback below
+        ClickHouse extracts the clause server-side; the DDL is only sent back
+        (from the first "TTL" on, and parsed in Python) for tables where that
+        extraction failed.
+        """
+        ttl_map: dict[str, str] = {}
+        # Streamed: fallback rows carry whole DDLs, only the TTL is kept
+        rows = client.execute_iter(
+            "SELECT concat(database, '.', name) AS full_name, "
+            f"trimBoth(extract(create_table_query, '{_TTL_EXTRACT_RE2}')) AS ttl, "
+            f"if(ttl = '', {_TTL_TAIL_SQL}, '') AS ddl "
+            "FROM system.tables "
+            "WHERE database NOT IN %(excluded)s "
+            "AND positionCaseInsensitive(create_table_query, 'TTL') > 0",
+            {"excluded": excluded},
+        )
+        for r in rows:
+            full_name = r["full_name"]
+            if r["ttl"]:
+                ttl_map[full_name] = r["ttl"]
+                continue
+            # The query only returns DDLs mentioning TTL, so an empty one
+            # means there is nothing to parse
+            ddl = r["ddl"]
+            if not ddl:
+                continue
+            ttl_match = _TTL_RE.search(ddl)
+            if ttl_match:
+                ttl_map[full_name] = ttl_match.group(1).strip()
+        return ttl_map
 
-        # Fallback: query_log
-        try:
-            rows = self._client.execute(
-                "SELECT arrayJoin(tables) AS table_name, max(event_time) AS last_insert "
-                "FROM system.query_log "
-                "WHERE type = 'QueryFinish' AND query_kind = 'Insert' "
-                f"AND event_time > now() - INTERVAL {int(log_days)} DAY "
-                "GROUP BY table_name "
-                "HAVING NOT startsWith(table_name, '_temporary_and_external_tables.')",
-            )
-            for r in rows:
-                result[r["table_name"]] = str(r["last_insert"])
-        except Exception as e:
-            logger.warning("Failed to get last INSERT from query_log: %s", e)
+    @staticmethod
+    def _get_last_selects(client: CHClient, log_days: int = QUERY_LOG_DAYS_DEFAULT) -> dict[str, str]:
+        """Get last SELECT time per table from query_log."""
+        rows = client.execute(
+            "SELECT arrayJoin(tables) AS table_name, max(event_time) AS last_select "
+            "FROM system.query_log "
+            "WHERE type = 'QueryFinish' AND query_kind = 'Select' "
+            f"AND event_date >= today() - {int(log_days)} "
+            f"AND event_time > now() - INTERVAL {int(log_days)} DAY "
+            "GROUP BY table_name "
+            f"HAVING {_EXCLUDED_TABLES_HAVING}",
+        )
+        return {r["table_name"]: str(r["last_select"]) for r in rows}
+
+    @staticmethod
+    def _get_last_inserts(client: CHClient, excluded: list,
+                          log_days: int = QUERY_LOG_DAYS_DEFAULT) -> dict[str, str]:
+        """Get last insert time per table from part_log, query_log and query_views_log."""
+        sqls = _last_insert_sqls(log_days)
+        params = {"excluded": excluded}
 
-        # Fallback: query_views_log (materialized views)
+        # All logs in one round trip, merged by ClickHouse
         try:
-            rows = self._client.execute(
-                "SELECT database || '.' || view_name AS table_name, "
-                "max(event_time) AS last_insert "
-                "FROM system.query_views_log "
-                "WHERE view_type = 'Materialized' AND status = 'QueryFinish' "
-                "GROUP BY table_name",
-            )
+            rows = client.execute(_max_last_insert_sql(*sqls.values()), params)
+            return {r["table_name"]: str(r["last_insert"]) for r in rows}
+        except Exception as e:
+            logger.warning("Failed to get last INSERT from %s: %s", " + ".join(sqls), e)
+
+        # Some log is not enabled: use whichever are available.
+        # Driver datetimes are compared as-is and only stringified at the end.
+        latest: dict[str, datetime] = {}
+        for log_name, sql in sqls.items():
+            try:
+                rows = client.execute(sql, params)
+            except Exception as e:
+                logger.warning("Failed to get last INSERT from %s: %s", log_name, e)
+                continue
             for r in rows:
                 tname = r["table_name"]
-                existing = result.get(tname, "")
-                new_val = str(r["last_insert"])
-                if new_val > existing:
-                    result[tname] = new_val
-        except Exception as e:
-            logger.warning("Failed to get last INSERT from query_views_log: %s", e)
+                if r["last_insert"] > latest.get(tname, datetime.min):
+                    latest[tname] = r["last_insert"]
 
-        return result
+        return {tname: str(ts) for tname, ts in latest.items()}
 
     def get_columns(self, full_table_name: str) -> list[dict]:
-        if "." in full_table_name:
-            db, table_name = full_table_name.split(".", 1)
-        else:
-            db, table_name = "default", full_table_name
-
+        """Columns of a table. Results are cached per service until invalidate_cache()."""
         try:
-            rows = self._client.execute(
-                "SELECT "
-                "  c.name AS name, "
-                "  c.type AS type, "
-                "  c.compression_codec AS codec, "
-                "  formatReadableSize(sum(pc.column_bytes_on_disk)) AS size, "
-                "  sum(pc.column_bytes_on_disk) AS size_bytes "
-                "FROM system.columns AS c "
-                "LEFT JOIN ( "
-                "  SELECT database, table, column, "
-                "    sum(column_bytes_on_disk) AS column_bytes_on_disk "
-                "  FROM system.parts_columns "
-                "  WHERE active AND database = %(db)s AND table = %(table)s "
-                "  GROUP BY database, table, column "
-                ") AS pc "
-                "ON c.name = pc.column AND c.table = pc.table AND c.database = pc.database "
-                "WHERE c.database = %(db)s AND c.table = %(table)s "
-                "GROUP BY c.name, c.type, c.compression_codec "
-                "ORDER BY size_bytes DESC",
-                {"db": db, "table": table_name},
-            )
-            return rows
+            return self._get_columns_cached(full_table_name)
         except Exception as e:
             logger.error("Failed to get columns for %s: %s", full_table_name, e)
             return []
 
-    def get_disk_info(self) -> list[dict]:
+    def _fetch_columns(self, full_table_name: str) -> list[dict]:
+        return self.get_columns_batch([full_table_name])[full_table_name]
+
+    def get_columns_batch(self, tables: list[str]) -> dict[str, list[dict]]:
+        """Columns of several tables with one query.
+
+        Returns dict mapping each requested table name to its columns (in the
+        same format as get_columns, largest first). Not cached.
+        """
+        pairs = [
+            (name, *(name.split(".", 1) if "." in name else ("default", name)))
+            for name in tables
+        ]
+        if not pairs:
+            return {}
+        full_names = [f"{db}.{table}" for _, db, table in pairs]
+        params = {
+            "dbs": sorted({db for _, db, _ in pairs}),
+            "tables": sorted({table for _, _, table in pairs}),
+            "full_names": full_names,
+        }
+        # database/table IN lists let ClickHouse enumerate only those tables;
+        # the full-name check drops cross combinations of the two lists.
+        # pc is already one row per column, so the join needs no outer GROUP BY.
+        where = (
+            "{p}database IN %(dbs)s AND {p}table IN %(tables)s "
+            "AND {p}database || '.' || {p}table IN %(full_names)s"
+        )
         rows = self._client.execute(
+            "SELECT "
+            "  c.database AS database, "
+            "  c.table AS table, "
+            "  c.name AS name, "
+            "  c.type AS type, "
+            "  c.compression_codec AS codec, "
+            "  formatReadableSize(coalesce(pc.column_bytes_on_disk, 0)) AS size, "
+            "  coalesce(pc.column_bytes_on_disk, 0) AS size_bytes "
+            "FROM system.columns AS c "
+            "LEFT JOIN ( "
+            "  SELECT database, table, column, "
+            "    sum(column_bytes_on_disk) AS column_bytes_on_disk "
+            "  FROM system.parts_columns "
+            f"  WHERE active AND {where.format(p='')} "
+            "  GROUP BY database, table, column "
+            ") AS pc "
+            "ON c.name = pc.column AND c.table = pc.table AND c.database = pc.database "
+            f"WHERE {where.format(p='c.')} "
+            "ORDER BY size_bytes DESC",
+            params,
+        )
+
+        grouped: defaultdict[str, list[dict]] = defaultdict(list)
+        for r in rows:
+            grouped[f"{r.pop('database')}.{r.pop('table')}"].append(r)
+        return {name: grouped.get(full, []) for (name, _, _), full in zip(pairs, full_names)}
+
+    def get_disk_info(self) -> list[dict]:
+        """Disk usage per disk, reused for DISK_INFO_CACHE_TTL seconds.
+
+        The server page asks for it on connect, on every tables refresh and
+        on every table selection. The returned rows must not be mutated.
+        """
+        return self._cached(("disks",), DISK_INFO_CACHE_TTL, lambda: self._client.execute(
             "SELECT "
             "  name, "
             "  formatReadableSize(total_space) AS total, "
@@ -224,8 +515,7 @@ class AnalysisService:
             "     round((total_space - free_space) * 100.0 / total_space, 1), "
             "     0) AS usage_percent "
             "FROM system.disks"
-        )
-        return rows
+        ))
 
     def get_query_history_filters(self, full_table_name: str,
                                    direct_only: bool = True,
@@ -236,14 +526,15 @@ class AnalysisService:
             sql = (
                 "SELECT user, query_kind, count() AS cnt "
                 "FROM system.query_log "
-                "WHERE type = 'QueryFinish' "
+                f"PREWHERE event_date >= today() - {int(log_days)} "
+                "AND type = 'QueryFinish' "
                 "AND has(tables, %(table)s) "
-                f"AND event_time > now() - INTERVAL {int(log_days)} DAY "
+                f"WHERE event_time > now() - INTERVAL {int(log_days)} DAY "
             )
             if direct_only:
-                sql += f"AND positionCaseInsensitive(query, '{short_name}') > 0 "
+                sql += "AND positionCaseInsensitive(query, %(short_name)s) > 0 "
             sql += "GROUP BY user, query_kind ORDER BY user, query_kind"
-            rows = self._client.execute(sql, {"table": full_table_name})
+            rows = self._client.execute(sql, {"table": full_table_name, "short_name": short_name})
             users = sorted(set(r['user'] for r in rows))
             kinds = sorted(set(r['query_kind'] for r in rows))
             return {"users": users, "kinds": kinds, "counts": rows}
@@ -251,40 +542,60 @@ class AnalysisService:
             logger.error("Failed to get query history filters for %s: %s", full_table_name, e)
             return {"users": [], "kinds": [], "counts": []}
 
+    @staticmethod
+    def _build_query_history_query(full_table_name: str, limit: int,
+                                   users: list[str] | None,
+                                   kinds: list[str] | None,
+                                   direct_only: bool,
+                                   log_days: int) -> tuple[str, dict]:
+        """Build the query_log SQL and params for a table's query history.
+
+        Every value is a bound parameter, so the query text only varies with
+        the filters in use, not with the table or user names.
+        """
+        short_name = full_table_name.split('.', 1)[1] if '.' in full_table_name else full_table_name
+        select_cols = "event_time, user, query_kind, query"
+        if not direct_only:
+            select_cols += ", positionCaseInsensitive(query, %(short_name)s) > 0 AS is_direct"
+        # The cheap filters go to PREWHERE so the heavy `query` column is
+        # only read for rows of this table, not for the whole date range.
+        parts = [
+            f"SELECT {select_cols}",
+            "FROM system.query_log",
+            f"PREWHERE event_date >= today() - {int(log_days)}",
+            "AND type = 'QueryFinish'",
+            "AND has(tables, %(table)s)",
+            f"WHERE event_time > now() - INTERVAL {int(log_days)} DAY",
+        ]
+        params: dict = {"table": full_table_name, "short_name": short_name, "limit": int(limit)}
+
+        if users:
+            parts.append("AND user IN %(users)s")
+            params["users"] = users
+        if kinds:
+            parts.append("AND query_kind IN %(kinds)s")
+            params["kinds"] = kinds
+        if direct_only:
+            parts.append("AND positionCaseInsensitive(query, %(short_name)s) > 0")
+
+        parts.append("ORDER BY event_time DESC")
+        parts.append("LIMIT %(limit)s")
+        return ' '.join(parts), params
+
     def get_query_history(self, full_table_name: str, limit: int = 200,
                           users: list[str] | None = None,
                           kinds: list[str] | None = None,
                           direct_only: bool = True,
                           log_days: int = QUERY_LOG_DAYS_DEFAULT) -> list[dict]:
-        short_name = full_table_name.split('.', 1)[1] if '.' in full_table_name else full_table_name
         try:
-            select_cols = "event_time, user, query_kind, query"
-            if not direct_only:
-                select_cols += f", positionCaseInsensitive(query, '{short_name}') > 0 AS is_direct"
-            parts = [
-                f"SELECT {select_cols} "
-                "FROM system.query_log "
-                "WHERE type = 'QueryFinish' "
-                "AND has(tables, %(table)s) "
-                f"AND event_time > now() - INTERVAL {int(log_days)} DAY",
-            ]
-            params: dict = {"table": full_table_name, "limit": limit}
-
-            if users:
-                parts.append("AND user IN %(users)s")
-                params["users"] = users
-            if kinds:
-                parts.append("AND query_kind IN %(kinds)s")
-                params["kinds"] = kinds
-            if direct_only:
-                parts.append(f"AND positionCaseInsensitive(query, '{short_name}') > 0")
-
-            parts.append("ORDER BY event_time DESC")
-            parts.append("LIMIT %(limit)s")
-
-            rows = self._client.execute(' '.join(parts), params)
-            for r in rows:
+            sql, params = self._build_query_history_query(
+                full_table_name, limit, users, kinds, direct_only, log_days)
+            # Streamed so the driver's raw row tuples (with full query texts)
+            # are never held alongside the dicts built from them
+            rows = []
+            for r in self._client.execute_iter(sql, params):
                 r["event_time"] = str(r["event_time"])
+                rows.append(r)
             return rows
         except Exception as e:
             logger.error("Failed to get query history for %s: %s", full_table_name, e)
@@ -296,28 +607,9 @@ class AnalysisService:
                               direct_only: bool = True,
                               log_days: int = QUERY_LOG_DAYS_DEFAULT) -> str:
         """Return the SQL query used by get_query_history (with parameters substituted)."""
-        short_name = full_table_name.split('.', 1)[1] if '.' in full_table_name else full_table_name
-        select_cols = "event_time, user, query_kind, query"
-        if not direct_only:
-            select_cols += f", positionCaseInsensitive(query, '{short_name}') > 0 AS is_direct"
-        parts = [
-            f"SELECT {select_cols}",
-            "FROM system.query_log",
-            "WHERE type = 'QueryFinish'",
-            f"AND has(tables, '{full_table_name}')",
-            f"AND event_time > now() - INTERVAL {int(log_days)} DAY",
-        ]
-        if users:
-            user_list = ', '.join(f"'{u}'" for u in users)
-            parts.append(f"AND user IN ({user_list})")
-        if kinds:
-            kind_list = ', '.join(f"'{k}'" for k in kinds)
-            parts.append(f"AND query_kind IN ({kind_list})")
-        if direct_only:
-            parts.append(f"AND positionCaseInsensitive(query, '{short_name}') > 0")
-        parts.append("ORDER BY event_time DESC")
-        parts.append(f"LIMIT {limit}")
-        return ' '.join(parts)
+        sql, params = self._build_query_history_query(
+            full_table_name, limit, users, kinds, direct_only, log_days)
+        return substitute_params(sql, params)
 
     @staticmethod
     def _parse_distributed_target(ddl: str, entity_db: str) -> str | None:
@@ -326,10 +618,7 @@ class AnalysisService:
         Distributed(cluster, database, table [, sharding_key [, policy]])
         Returns 'database.table' or None if parsing fails.
         """
-        m = re.search(
-            r"Distributed\s*\(\s*'[^']*'\s*,\s*'?([^',\s)]+)'?\s*,\s*'?([^',\s)]+)'?",
-            ddl, re.IGNORECASE,
-        )
+        m = _DISTRIBUTED_RE.search(ddl)
         if m:
             db = m.group(1).strip("'\"` ")
             tbl = m.group(2).strip("'\"` ")
@@ -343,46 +632,74 @@ class AnalysisService:
 
         Returns dict mapping table name to list of (entity_name, engine) tuples.
         """
-        excluded = list(EXCLUDED_DATABASES)
         try:
-            rows = self._client.execute(
-                "SELECT database, name, engine, create_table_query "
-                "FROM system.tables "
-                "WHERE database NOT IN %(excluded)s",
-                {"excluded": excluded},
-            )
+            rows = self._get_all_ddl()
         except Exception as e:
             logger.warning("Failed to get DDL for references: %s", e)
             return {}
+        return self._cached(("table_refs",), RESULT_CACHE_TTL,
+                            lambda: self._resolve_table_references(rows))
 
+    def _resolve_table_references(self, rows: list[dict]) -> dict[str, list[tuple[str, str]]]:
         entities: dict[str, tuple[str, str]] = {}
         for r in rows:
             full_name = f"{r['database']}.{r['name']}"
             entities[full_name] = (r['create_table_query'] or '', r.get('engine', ''))
 
         references: dict[str, list[tuple[str, str]]] = {}
+
+        # Each DDL is tokenized once and its identifiers are looked up in
+        # `entities`, instead of running regexes for every (target, DDL) pair.
+        for entity_name, (ddl, engine) in entities.items():
+            entity_db = entity_name.split('.', 1)[0]
+            if engine == 'Distributed':
+                # Only match if the Distributed engine clause targets this table
+                dist_target = self._parse_distributed_target(ddl, entity_db)
+                if dist_target in entities and dist_target != entity_name:
+                    references.setdefault(dist_target, []).append((entity_name, engine))
+                continue
+
+            names = _scan_ddl(ddl)
+            # Full name match (any database), short name only within the same database
+            candidates = {name for name in names.dotted if name in entities}
+            candidates.update(
+                full for full in (f"{entity_db}.{word}" for word in names.bare)
+                if full in entities
+            )
+            candidates.discard(entity_name)
+            for target in candidates:
+                db, short = target.split('.', 1)
+                # Non-word names are tokenized wrongly; the regex pass below owns them
+                if not (_is_word(db) and _is_word(short)):
+                    continue
+                # Skip if target is the DESTINATION of this entity (MV writes TO target)
+                if target.lower() in names.to_dotted:
+                    continue
+                if db == entity_db and short.lower() in names.to_bare:
+                    continue
+                references.setdefault(target, []).append((entity_name, engine))
+
+        # Names with non-word characters can't be found by tokenizing; match
+        # those few with word-boundary regexes as before.
         for target in entities:
             db, short = target.split('.', 1)
+            if _is_word(db) and _is_word(short):
+                continue
             # Regex with word boundaries to avoid substring false positives
             full_pattern = re.compile(r'\b' + re.escape(target) + r'\b')
             short_pattern = re.compile(r'\b' + re.escape(short) + r'\b(?!\.)')
-            # Pattern to detect target as DESTINATION (TO target in MV DDL)
-            to_full_pattern = re.compile(r'\bTO\s+' + re.escape(target) + r'\b', re.IGNORECASE)
-            to_short_pattern = re.compile(r'\bTO\s+' + re.escape(short) + r'\b(?!\.)', re.IGNORECASE)
+            # Pattern to detect target as DESTINATION (TO target in MV DDL);
+            # matched case-sensitively against the lowercased DDL
+            to_full_pattern = re.compile(r'\bto\s+' + re.escape(target.lower()) + r'\b')
+            to_short_pattern = re.compile(r'\bto\s+' + re.escape(short.lower()) + r'\b(?!\.)')
             refs = []
             for entity_name, (ddl, engine) in entities.items():
-                if entity_name == target:
+                # Distributed entities were resolved in the first pass
+                if entity_name == target or engine == 'Distributed':
                     continue
-                entity_db = entity_name.split('.', 1)[0]
-
-                if engine == 'Distributed':
-                    # Only match if the Distributed engine clause targets this table
-                    dist_target = self._parse_distributed_target(ddl, entity_db)
-                    if dist_target == target:
-                        refs.append((entity_name, engine))
+                if short not in ddl:
                     continue
 
-                # Non-Distributed: existing regex match logic
                 matched = False
                 # Full name match (any database)
                 if full_pattern.search(ddl):
@@ -393,41 +710,47 @@ class AnalysisService:
                 if not matched:
                     continue
                 # Skip if target is the DESTINATION of this entity (MV writes TO target)
-                if to_full_pattern.search(ddl):
+                ddl_lower = ddl.lower()
+                if to_full_pattern.search(ddl_lower):
                     continue
-                if entity_name.startswith(db + '.') and to_short_pattern.search(ddl):
+                if entity_name.startswith(db + '.') and to_short_pattern.search(ddl_lower):
                     continue
                 refs.append((entity_name, engine))
             if refs:
-                references[target] = sorted(refs)
+                references.setdefault(target, []).extend(refs)
 
-        return references
+        return {target: sorted(refs) for target, refs in references.items()}
 
-    def get_column_references(self, full_table_name: str) -> dict[str, list[tuple[str, str]]]:
+    def get_column_references(self, full_table_name: str,
+                              column_names: list[str] | None = None) -> dict[str, list[tuple[str, str]]]:
         """For each column of a table, find entities whose DDL references the column name.
 
+        *column_names* may be passed when the caller already has them (e.g.
+        from get_columns); otherwise they are read from system.columns.
+
         Returns dict mapping column name to list of (entity_name, engine) tuples.
         """
-        excluded = list(EXCLUDED_DATABASES)
         try:
-            rows = self._client.execute(
-                "SELECT database, name, engine, create_table_query "
-                "FROM system.tables "
-                "WHERE database NOT IN %(excluded)s",
-                {"excluded": excluded},
-            )
+            rows = self._get_all_ddl()
         except Exception as e:
             logger.warning("Failed to get DDL for column references: %s", e)
             return {}
+        key = ("column_refs", full_table_name,
+               None if column_names is None else tuple(column_names))
+        return self._cached(key, RESULT_CACHE_TTL, lambda: self._resolve_column_references(
+            rows, full_table_name, column_names))
 
+    def _resolve_column_references(self, rows: list[dict], full_table_name: str,
+                                   column_names: list[str] | None) -> dict[str, list[tuple[str, str]]]:
         db, short = full_table_name.split('.', 1) if '.' in full_table_name else ('default', full_table_name)
 
         # Only consider entities that reference our table as SOURCE (word boundary match)
         full_pattern = re.compile(r'\b' + re.escape(full_table_name) + r'\b')
         short_pattern = re.compile(r'\b' + re.escape(short) + r'\b(?!\.)')
-        # Pattern to detect our table as DESTINATION (TO table in MV DDL)
-        to_full_pattern = re.compile(r'\bTO\s+' + re.escape(full_table_name) + r'\b', re.IGNORECASE)
-        to_short_pattern = re.compile(r'\bTO\s+' + re.escape(short) + r'\b(?!\.)', re.IGNORECASE)
+        # Pattern to detect our table as DESTINATION (TO table in MV DDL);
+        # matched case-sensitively against the lowercased DDL
+        to_full_pattern = re.compile(r'\bto\s+' + re.escape(full_table_name.lower()) + r'\b')
+        to_short_pattern = re.compile(r'\bto\s+' + re.escape(short.lower()) + r'\b(?!\.)')
         referring_entities: dict[str, tuple[str, str]] = {}
         for r in rows:
             entity = f"{r['database']}.{r['name']}"
@@ -444,6 +767,10 @@ class AnalysisService:
                     referring_entities[entity] = (ddl, engine)
                 continue
 
+            # Plain substring test first: most DDLs don't mention the table
+            # at all, and then none of the patterns below can match
+            if short not in ddl:
+                continue
             matched = False
             if full_pattern.search(ddl):
                 matched = True
@@ -452,80 +779,84 @@ class AnalysisService:
             if not matched:
                 continue
             # Skip if our table is the DESTINATION of this entity
-            if to_full_pattern.search(ddl):
+            ddl_lower = ddl.lower()
+            if to_full_pattern.search(ddl_lower):
                 continue
-            if entity.startswith(db + '.') and to_short_pattern.search(ddl):
+            if entity.startswith(db + '.') and to_short_pattern.search(ddl_lower):
                 continue
             referring_entities[entity] = (ddl, engine)
 
-        # Get column names of our table
-        try:
-            cols = self._client.execute(
-                "SELECT name FROM system.columns WHERE database = %(db)s AND table = %(table)s",
-                {"db": db, "table": short},
-            )
-        except Exception:
+        # Nothing refers to the table, so no column can be referenced
+        if not referring_entities:
             return {}
 
-        result: dict[str, list[tuple[str, str]]] = {}
-        for col_row in cols:
-            col_name = col_row['name']
-            col_pattern = re.compile(r'\b' + re.escape(col_name) + r'\b')
-            refs = [(entity, engine) for entity, (ddl, engine) in referring_entities.items() if col_pattern.search(ddl)]
-            if refs:
-                result[col_name] = sorted(refs)
-
-        return result
+        # Get column names of our table
+        if column_names is None:
+            try:
+                cols = self._client.execute(
+                    "SELECT name FROM system.columns WHERE database = %(db)s AND table = %(table)s",
+                    {"db": db, "table": short},
+                )
+            except Exception:
+                return {}
+            column_names = [r['name'] for r in cols]
+
+        # Scan each referring DDL once: its tokens are intersected with all
+        # word-like column names at once, so the cost no longer grows with
+        # columns x entities. Other names keep a word-boundary regex each.
+        word_cols = {name for name in column_names if _is_word(name)}
+        other_cols = {
+            name: re.compile(r'\b' + re.escape(name) + r'\b')
+            for name in column_names if name not in word_cols
+        }
+        refs_by_col: defaultdict[str, list[tuple[str, str]]] = defaultdict(list)
+        for entity, (ddl, engine) in referring_entities.items():
+            for col_name in _scan_ddl(ddl).words & word_cols:
+                refs_by_col[col_name].append((entity, engine))
+            for col_name, col_pattern in other_cols.items():
+                if col_name in ddl and col_pattern.search(ddl):
+                    refs_by_col[col_name].append((entity, engine))
+
+        return {name: sorted(refs_by_col[name]) for name in column_names if name in refs_by_col}
 
     def get_tables_sql(self, log_days: int = QUERY_LOG_DAYS_DEFAULT) -> str:
         """Return the SQL queries used by get_tables()."""
         excluded = list(EXCLUDED_DATABASES)
         excluded_str = ', '.join(f"'{db}'" for db in excluded)
         queries = [
-            f"-- 1. Table sizes\n"
-            f"SELECT database, table, formatReadableSize(sum(bytes_on_disk)) AS size, "
-            f"sum(bytes_on_disk) AS size_bytes "
-            f"FROM system.parts "
-            f"WHERE active AND database NOT IN ({excluded_str}) "
-            f"GROUP BY database, table ORDER BY database, table",
+            f"-- 1. Table sizes + replicated flag\n"
+            f"SELECT concat(p.database, '.', p.table) AS full_name, "
+            f"formatReadableSize(sum(p.bytes_on_disk)) AS size, "
+            f"sum(p.bytes_on_disk) AS size_bytes, "
+            f"any(r.replicated) AS replicated "
+            f"FROM system.parts AS p "
+            f"LEFT JOIN ("
+            f"SELECT database, table, length(replica_is_active) > 1 AS replicated "
+            f"FROM system.replicas WHERE database NOT IN ({excluded_str})"
+            f") AS r ON p.database = r.database AND p.table = r.table "
+            f"WHERE p.active AND p.database NOT IN ({excluded_str}) "
+            f"GROUP BY p.database, p.table ORDER BY size_bytes DESC",
 
             f"-- 2. Last SELECT per table\n"
             f"SELECT arrayJoin(tables) AS table_name, max(event_time) AS last_select "
             f"FROM system.query_log "
             f"WHERE type = 'QueryFinish' AND query_kind = 'Select' "
+            f"AND event_date >= today() - {int(log_days)} "
             f"AND event_time > now() - INTERVAL {int(log_days)} DAY "
             f"GROUP BY table_name "
-            f"HAVING NOT startsWith(table_name, '_temporary_and_external_tables.')",
-
-            f"-- 3a. Last INSERT (preferred: part_log)\n"
-            f"SELECT database, table, max(event_time) AS last_insert "
-            f"FROM system.part_log "
-            f"WHERE event_type = 'NewPart' AND database NOT IN ({excluded_str}) "
-            f"GROUP BY database, table",
-
-            f"-- 3b. Last INSERT fallback: query_log\n"
-            f"SELECT arrayJoin(tables) AS table_name, max(event_time) AS last_insert "
-            f"FROM system.query_log "
-            f"WHERE type = 'QueryFinish' AND query_kind = 'Insert' "
-            f"AND event_time > now() - INTERVAL {int(log_days)} DAY "
-            f"GROUP BY table_name "
-            f"HAVING NOT startsWith(table_name, '_temporary_and_external_tables.')",
-
-            f"-- 3c. Last INSERT fallback: query_views_log\n"
-            f"SELECT database || '.' || view_name AS table_name, "
-            f"max(event_time) AS last_insert "
-            f"FROM system.query_views_log "
-            f"WHERE view_type = 'Materialized' AND status = 'QueryFinish' "
-            f"GROUP BY table_name",
+            f"HAVING {_EXCLUDED_TABLES_HAVING}",
 
-            f"-- 4. Replicated tables\n"
-            f"SELECT database, table FROM system.replicas "
-            f"WHERE length(replica_is_active) > 1",
+            "-- 3. Last INSERT: part_log + query_log + query_views_log\n"
+            + substitute_params(_max_last_insert_sql(*_last_insert_sqls(log_days).values()),
+                                {"excluded": excluded}),
 
-            f"-- 5. DDL + TTL\n"
-            f"SELECT database, name, create_table_query "
+            f"-- 4. TTL\n"
+            f"SELECT concat(database, '.', name) AS full_name, "
+            f"trimBoth(extract(create_table_query, '{_TTL_EXTRACT_RE2}')) AS ttl, "
+            f"if(ttl = '', {_TTL_TAIL_SQL}, '') AS ddl "
             f"FROM system.tables "
-            f"WHERE database NOT IN ({excluded_str})",
+            f"WHERE database NOT IN ({excluded_str}) "
+            f"AND positionCaseInsensitive(create_table_query, 'TTL') > 0",
         ]
         return ';\n\n'.join(queries)
 
@@ -536,18 +867,36 @@ class AnalysisService:
 
         Returns dict with 'nodes' and 'edges' for graph rendering.
         """
-        excluded = list(EXCLUDED_DATABASES)
         try:
-            rows = self._client.execute(
-                "SELECT database, name, engine, create_table_query "
-                "FROM system.tables "
-                "WHERE database NOT IN %(excluded)s",
-                {"excluded": excluded},
-            )
+            rows = self._get_all_ddl()
         except Exception as e:
             logger.error("Failed to get tables for MV flow: %s", e)
             return {'nodes': [], 'edges': []}
 
+        # The graph is catalog-wide; only the BFS start differs per table
+        edges, node_types, forward, backward = self._cached(
+            ("mv_graph",), RESULT_CACHE_TTL, lambda: self._build_mv_graph(rows))
+
+        if full_table_name not in forward and full_table_name not in backward:
+            return {'nodes': [], 'edges': []}
+
+        # Forward BFS (downstream) + Backward BFS (upstream)
+        visited = _bfs(forward, full_table_name) | _bfs(backward, full_table_name)
+
+        relevant_edges = [{'from': s, 'to': d} for s, d in edges if s in visited and d in visited]
+        relevant_nodes = [
+            {'id': n, 'type': node_types.get(n, 'table')}
+            for n in visited
+        ]
+        return {'nodes': relevant_nodes, 'edges': relevant_edges}
+
+    @staticmethod
+    def _build_mv_graph(rows: list[dict]) -> tuple[list[tuple[str, str]], dict[str, str],
+                                                   dict[str, set[str]], dict[str, set[str]]]:
+        """Parse MV source/target edges from all DDLs.
+
+        Returns (edges, node_types, forward, backward adjacency).
+        """
         edges = []
         node_types = {}
 
@@ -559,12 +908,10 @@ class AnalysisService:
                 node_types[full_name] = 'mv'
 
                 # Parse source: AS SELECT ... FROM <table>
-                as_match = re.search(r'\bAS\s+SELECT\b', ddl, re.IGNORECASE)
+                as_match = _AS_SELECT_RE.search(ddl)
                 if as_match:
-                    select_part = ddl[as_match.start():]
-                    from_match = re.search(
-                        r'\bFROM\s+(\w+(?:\.\w+)?)', select_part, re.IGNORECASE,
-                    )
+                    # Search from the match instead of slicing a copy of the DDL
+                    from_match = _FROM_RE.search(ddl, as_match.start())
                     if from_match:
                         source = from_match.group(1)
                         if '.' not in source:
@@ -572,7 +919,7 @@ class AnalysisService:
                         edges.append((source, full_name))
 
                 # Parse target: TO <table>
-                to_match = re.search(r'\bTO\s+(\w+(?:\.\w+)?)', ddl, re.IGNORECASE)
+                to_match = _TO_RE.search(ddl)
                 if to_match:
                     target = to_match.group(1)
                     if '.' not in target:
@@ -588,54 +935,43 @@ class AnalysisService:
         for src, dst in edges:
             forward.setdefault(src, set()).add(dst)
             backward.setdefault(dst, set()).add(src)
-
-        if full_table_name not in forward and full_table_name not in backward:
-            return {'nodes': [], 'edges': []}
-
-        # Forward BFS (downstream) + Backward BFS (upstream)
-        visited = _bfs(forward, full_table_name) | _bfs(backward, full_table_name)
-
-        relevant_edges = [{'from': s, 'to': d} for s, d in edges if s in visited and d in visited]
-        relevant_nodes = [
-            {'id': n, 'type': node_types.get(n, 'table')}
-            for n in visited
-        ]
-        return {'nodes': relevant_nodes, 'edges': relevant_edges}
+        return edges, node_types, forward, backward
 
     def get_query_flow(self, full_table_name: str, log_days: int = QUERY_LOG_DAYS_DEFAULT) -> dict:
         """Get query-based data flow (INSERT...SELECT patterns) involving the given table."""
+        edges_set: set[tuple[str, str]] = set()
+        all_tables: set[str] = set()
+
+        # Streamed: each INSERT text is parsed and dropped as it arrives
         try:
-            rows = self._client.execute(
+            rows = self._client.execute_iter(
                 "SELECT DISTINCT query, tables "
                 "FROM system.query_log "
                 "WHERE type = 'QueryFinish' "
                 "AND query_kind = 'Insert' "
                 "AND length(tables) > 1 "
                 "AND has(tables, %(table)s) "
+                f"AND event_date >= today() - {int(log_days)} "
                 f"AND event_time > now() - INTERVAL {int(log_days)} DAY "
                 "LIMIT 1000",
                 {"table": full_table_name},
             )
+            for r in rows:
+                tables_list = r['tables']
+                query = r['query']
+
+                insert_match = _INSERT_INTO_RE.search(query)
+                if insert_match:
+                    target = insert_match.group(1).strip('`"')
+                    for t in tables_list:
+                        if t != target:
+                            edges_set.add((t, target))
+                            all_tables.add(t)
+                            all_tables.add(target)
         except Exception as e:
             logger.error("Failed to get query flow: %s", e)
             return {'nodes': [], 'edges': []}
 
-        edges_set: set[tuple[str, str]] = set()
-        all_tables: set[str] = set()
-
-        for r in rows:
-            tables_list = r['tables']
-            query = r['query']
-
-            insert_match = re.search(r'\bINSERT\s+INTO\s+(\S+)', query, re.IGNORECASE)
-            if insert_match:
-                target = insert_match.group(1).strip('`"')
-                for t in tables_list:
-                    if t != target:
-                        edges_set.add((t, target))
-                        all_tables.add(t)
-                        all_tables.add(target)
-
         # BFS filtering: keep only tables in the vertical chain of full_table_name
         forward: dict[str, set[str]] = {}
         backward: dict[str, set[str]] = {}
@@ -678,29 +1014,36 @@ class AnalysisService:
         )
         return rows
 
-    def get_text_log_summary(self) -> list[dict]:
-        """Aggregated text_log summary grouped by thread_name, level, message_format_string."""
+    def get_text_log_summary(self, force_refresh: bool = False) -> list[dict]:
+        """Aggregated text_log summary grouped by thread_name, level, message_format_string.
+
+        Reused for RESULT_CACHE_TTL seconds unless *force_refresh* is set.
+        """
         try:
-            rows = self._client.execute(
-                "SELECT thread_name, level, "
-                "  multiIf(level=1,'Fatal', level=2,'Critical', level=3,'Error', "
-                "          level=4,'Warning', toString(level)) AS level_name, "
-                "  argMax(message, event_time_microseconds) AS message_example, "
-                "  max(event_time_microseconds) AS max_time, "
-                "  count() AS cnt "
-                "FROM system.text_log "
-                "WHERE event_time_microseconds > today() - interval 2 week "
-                "AND level <= 4 "
-                "GROUP BY thread_name, level, message_format_string "
-                "ORDER BY max_time DESC"
-            )
-            for r in rows:
-                r['max_time'] = str(r['max_time'])
-            return rows
+            return self._cached(("text_log_summary",), RESULT_CACHE_TTL,
+                                self._fetch_text_log_summary, refresh=force_refresh)
         except Exception as e:
             logger.error("Failed to get text_log summary: %s", e)
             return []
 
+    def _fetch_text_log_summary(self) -> list[dict]:
+        rows = self._client.execute(
+            "SELECT thread_name, level, "
+            "  multiIf(level=1,'Fatal', level=2,'Critical', level=3,'Error', "
+            "          level=4,'Warning', toString(level)) AS level_name, "
+            "  argMax(message, event_time_microseconds) AS message_example, "
+            "  max(event_time_microseconds) AS max_time, "
+            "  count() AS cnt "
+            "FROM system.text_log "
+            "WHERE event_time_microseconds > today() - interval 2 week "
+            "AND level <= 4 "
+            "GROUP BY thread_name, level, message_format_string "
+            "ORDER BY max_time DESC"
+        )
+        for r in rows:
+            r['max_time'] = str(r['max_time'])
+        return rows
+
     def get_user_stats(self, log_days: int = QUERY_LOG_DAYS_DEFAULT) -> list[dict]:
         """Get per-user query statistics from query_log."""
         try:
@@ -723,6 +1066,7 @@ class AnalysisService:
                 "  countIf(query_kind NOT IN ('Select', 'Insert')) AS other_queries "
                 "FROM system.query_log "
                 "WHERE type = 'QueryFinish' "
+                f"AND event_date >= today() - {int(log_days)} "
                 f"AND event_time > now() - INTERVAL {int(log_days)} DAY "
                 "GROUP BY user "
                 "ORDER BY query_count DESC"
@@ -751,6 +1095,7 @@ class AnalysisService:
                 "  query_duration_ms, read_rows, written_rows, memory_usage "
                 "FROM system.query_log "
                 "WHERE type IN ('QueryFinish', 'ExceptionWhileProcessing') "
+                f"AND event_date >= today() - {int(log_days)} "
                 f"AND event_time > now() - INTERVAL {int(log_days)} DAY "
                 "AND user = %(user)s"
             ]
@@ -765,9 +1110,10 @@ class AnalysisService:
                 parts.append("AND query_kind = %(kind)s")
                 params["kind"] = kind
             parts.append(f"ORDER BY event_time DESC LIMIT {int(limit)}")
-            rows = self._client.execute(' '.join(parts), params)
-            for r in rows:
+            rows = []
+            for r in self._client.execute_iter(' '.join(parts), params):
                 r['event_time'] = str(r['event_time'])
+                rows.append(r)
             return rows
         except Exception as e:
             logger.error("Failed to get user queries for %s: %s", user, e)
@@ -794,6 +1140,7 @@ class AnalysisService:
                 "  argMax(exception, event_time) AS last_exception "
                 "FROM system.query_log "
                 "WHERE type IN ('QueryFinish', 'ExceptionWhileProcessing') "
+                f"AND event_date >= today() - {int(log_days)} "
                 f"AND event_time > now() - INTERVAL {int(log_days)} DAY "
                 "AND user = %(user)s"
             ]
@@ -851,32 +1198,32 @@ class AnalysisService:
         )
         result: dict = {"users": [], "query_kinds": [], "types": [], "databases": []}
         try:
-            rows = self._client.execute(
+            cols = self._client.execute_columnar(
                 f"SELECT DISTINCT user FROM system.query_log WHERE {base_where} ORDER BY user"
             )
-            result["users"] = [r["user"] for r in rows]
+            result["users"] = cols["user"]
         except Exception as e:
             logger.error("Failed to get query_logs filter users: %s", e)
         try:
-            rows = self._client.execute(
+            cols = self._client.execute_columnar(
                 f"SELECT DISTINCT query_kind FROM system.query_log WHERE {base_where} ORDER BY query_kind"
             )
-            result["query_kinds"] = [r["query_kind"] for r in rows]
+            result["query_kinds"] = cols["query_kind"]
         except Exception as e:
             logger.error("Failed to get query_logs filter query_kinds: %s", e)
         try:
-            rows = self._client.execute(
+            cols = self._client.execute_columnar(
                 f"SELECT DISTINCT type FROM system.query_log WHERE {base_where} ORDER BY type"
             )
-            result["types"] = [r["type"] for r in rows]
+            result["types"] = cols["type"]
         except Exception as e:
             logger.error("Failed to get query_logs filter types: %s", e)
         try:
-            rows = self._client.execute(
+            cols = self._client.execute_columnar(
                 "SELECT DISTINCT arrayJoin(databases) AS db FROM system.query_log "
                 f"WHERE {base_where} ORDER BY db"
             )
-            result["databases"] = [r["db"] for r in rows]
+            result["databases"] = cols["db"]
         except Exception as e:
             logger.error("Failed to get query_logs filter databases: %s", e)
         return result
@@ -905,7 +1252,9 @@ class AnalysisService:
                 unit = event_date_filter['unit'].upper()
                 if unit not in ('HOUR', 'DAY', 'MONTH'):
                     unit = 'DAY'
-                parts.append(f"AND event_time > now() - INTERVAL {val} {unit}")
+                # event_date bound first so whole partitions are pruned
+                parts.append(f"AND event_date >= toDate(now() - INTERVAL {val} {unit}) "
+                             f"AND event_time > now() - INTERVAL {val} {unit}")
             elif mode == 'date':
                 parts.append("AND event_date = %(flt_date)s")
                 params['flt_date'] = event_date_filter['date']
@@ -971,9 +1320,10 @@ class AnalysisService:
             f"ORDER BY event_time DESC LIMIT {int(limit)}"
         )
         try:
-            rows = self._client.execute(sql, params)
-            for r in rows:
+            rows = []
+            for r in self._client.execute_iter(sql, params):
                 r['event_time'] = str(r['event_time'])
+                rows.append(r)
             return rows
         except Exception as e:
             logger.error("Failed to get query_logs: %s", e)
@@ -1058,11 +1408,4 @@ class AnalysisService:
                 f"FROM system.query_log WHERE {where} "
                 f"ORDER BY event_time DESC LIMIT {int(limit)}"
             )
-        for k, v in params.items():
-            placeholder = f'%({k})s'
-            if isinstance(v, list):
-                formatted = '(' + ', '.join(f"'{x}'" for x in v) + ')'
-            else:
-                formatted = f"'{v}'"
-            sql = sql.replace(placeholder, formatted)
-        return sql
+        return substitute_params(sql, params)
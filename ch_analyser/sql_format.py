@@ -5,11 +5,12 @@ for ClickHouse-specific functions (camelCase) that sqlparse uppercases.
 """
 
 import re
+from functools import lru_cache
 
 import sqlparse
 
 # ClickHouse functions with correct casing (camelCase)
-CLICKHOUSE_FUNCTIONS = [
+CLICKHOUSE_FUNCTIONS = (
     # Dict functions
     "dictGet", "dictGetOrDefault", "dictGetOrNull", "dictHas",
     "dictGetHierarchy", "dictIsIn",
@@ -104,10 +105,19 @@ CLICKHOUSE_FUNCTIONS = [
     "toTypeName", "blockSize", "materialize", "ignore",
     "currentDatabase", "currentUser", "hostName", "uptime", "version",
     "throwIf", "identity",
-]
+)
 
 _FUNC_CASE_MAP = {f.lower(): f for f in CLICKHOUSE_FUNCTIONS}
 
+# Known function names followed by an opening parenthesis, matched
+# ASCII-case-insensitively so other identifiers never reach the callback.
+# Longest names first, so e.g. dictGetOrDefault is not cut to dictGet.
+_FUNC_CALL_RE = re.compile(
+    r'\b((?ai:'
+    + '|'.join(sorted(map(re.escape, _FUNC_CASE_MAP.values()), key=len, reverse=True))
+    + r'))\s*\('
+)
+
 # ClickHouse system table column names that sqlparse incorrectly treats as SQL keywords
 CLICKHOUSE_COLUMN_KEYWORDS = {
     "type", "tables", "user", "table", "database", "column", "engine",
@@ -123,14 +133,7 @@ CLICKHOUSE_COLUMN_KEYWORDS = {
 
 def _restore_function_case(sql: str) -> str:
     """Restore correct casing for ClickHouse functions after keyword uppercasing."""
-    def _replace(match):
-        name = match.group(1)
-        correct = _FUNC_CASE_MAP.get(name.lower())
-        if correct:
-            return correct + '('
-        return match.group(0)
-
-    return re.sub(r'\b([a-zA-Z_][a-zA-Z0-9_]*)\s*\(', _replace, sql)
+    return _FUNC_CALL_RE.sub(lambda m: _FUNC_CASE_MAP[m.group(1).lower()] + '(', sql)
 
 
 def _restore_column_case(formatted_sql: str, original_sql: str) -> str:
@@ -154,9 +157,13 @@ def _restore_column_case(formatted_sql: str, original_sql: str) -> str:
     return re.sub(pattern, _replace, formatted_sql)
 
 
+# The same DDL / query text is formatted again on every re-render or reopen
+@lru_cache(maxsize=512)
 def format_clickhouse_sql(sql: str) -> str:
     """Format SQL with sqlparse, then restore ClickHouse function and column casing."""
     result = sqlparse.format(sql, reindent=True, keyword_case='upper')
-    result = _restore_function_case(result)
+    # No parenthesis means no function call to fix
+    if '(' in result:
+        result = _restore_function_case(result)
     result = _restore_column_case(result, sql)
     return result
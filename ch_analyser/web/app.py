@@ -7,10 +7,6 @@ from ch_analyser.monitoring.store import MonitoringStore
 from ch_analyser.monitoring.scheduler import start_scheduler, stop_scheduler
 from ch_analyser.logging_config import get_logger
 
-# Import pages so their @ui.page decorators register routes
-import ch_analyser.web.pages.login  # noqa: F401
-import ch_analyser.web.pages.main  # noqa: F401
-
 logger = get_logger(__name__)
 
 
@@ -35,4 +31,9 @@ async def _shutdown():
 
 def start():
     """Run the NiceGUI web server."""
+    # Import pages here so their @ui.page decorators register routes only
+    # when the server actually starts (not for --help or library imports)
+    import ch_analyser.web.pages.login  # noqa: F401
+    import ch_analyser.web.pages.main  # noqa: F401
+
     ui.run(port=8080, title='ClickHouse Analyser', storage_secret='ch-analyser-secret')
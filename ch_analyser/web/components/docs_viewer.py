@@ -1,6 +1,7 @@
 """In-app documentation viewer dialog (user-facing docs only)."""
 
 import re
+from functools import lru_cache
 from pathlib import Path
 
 from nicegui import ui
@@ -12,11 +13,19 @@ USER_DOCS = [
     ('Релизы', 'releases.md'),
 ]
 
-_DOCS_DIR = Path(__file__).resolve().parents[3] / 'docs'
+
+@lru_cache(maxsize=1)
+def _docs_dir() -> Path:
+    """Docs directory, resolved on first use rather than at import."""
+    return Path(__file__).resolve().parents[3] / 'docs'
+
+
+# Markdown cross-link to another doc, e.g. [Релизы](releases.md)
+_MD_LINK_RE = re.compile(r'\[([^\]]+)\]\([a-z-]+\.md\)')
 
 
 def _read_doc(filename: str) -> str:
-    path = _DOCS_DIR / filename
+    path = _docs_dir() / filename
     if path.is_file():
         return path.read_text(encoding='utf-8')
     return f'*Файл `{filename}` не найден.*'
@@ -27,7 +36,20 @@ def _preprocess_links(content: str) -> str:
     def _replace(m):
         text = m.group(1)
         return f'**{text}** *(см. меню слева)*'
-    return re.sub(r'\[([^\]]+)\]\([a-z-]+\.md\)', _replace, content)
+    return _MD_LINK_RE.sub(_replace, content)
+
+
+@lru_cache(maxsize=32)
+def _load_processed(filename: str, mtime: float) -> str:
+    """Read and preprocess a doc; *mtime* is part of the key so edits are picked up."""
+    return _preprocess_links(_read_doc(filename))
+
+
+def _doc_mtime(filename: str) -> float:
+    try:
+        return (_docs_dir() / filename).stat().st_mtime
+    except OSError:
+        return 0.0
 
 
 def show_docs_dialog():
@@ -45,20 +67,25 @@ def show_docs_dialog():
 
         nav_buttons: dict[str, ui.button] = {}
         content_container = None
+        active_fname: str | None = None
 
         def _show(filename: str):
-            nonlocal content_container
-            raw = _read_doc(filename)
-            processed = _preprocess_links(raw)
+            nonlocal content_container, active_fname
+            processed = _load_processed(filename, _doc_mtime(filename))
             content_container.clear()
             with content_container:
                 ui.markdown(processed).classes('w-full')
-            for fname, btn in nav_buttons.items():
-                if fname == filename:
-                    btn.props('color=primary')
-                else:
-                    btn.props('color=grey-4 text-color=grey-8')
-                btn.update()
+            # Only the previously active and the new button change style
+            if active_fname == filename:
+                return
+            if active_fname is not None:
+                prev = nav_buttons[active_fname]
+                prev.props('color=grey-4 text-color=grey-8')
+                prev.update()
+            btn = nav_buttons[filename]
+            btn.props('color=primary')
+            btn.update()
+            active_fname = filename
 
         # Body: sidebar + content — takes all remaining height
         with ui.element('div').style('flex: 1 1 0; min-height: 0; position: relative; width: 100%'):
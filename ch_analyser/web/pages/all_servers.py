@@ -27,6 +27,19 @@ def _format_bytes(b: int) -> str:
     return f'{b:.1f} PiB'
 
 
+def _ts_label(ts, labels: dict) -> str:
+    """Chart axis label for a snapshot timestamp, memoized in *labels*.
+
+    Every series shares the same hourly timestamps, so each one is
+    formatted once per chart instead of once per point.
+    """
+    label = labels.get(ts)
+    if label is None:
+        label = ts.strftime('%Y-%m-%d %H:%M') if isinstance(ts, datetime) else str(ts)
+        labels[ts] = label
+    return label
+
+
 def _resizable_chart_wrapper(storage_key: str, default_height: int = 350):
     """Create a resizable wrapper div for a chart. Returns the wrapper element as context manager."""
     height = app.storage.user.get(storage_key, default_height)
@@ -381,16 +394,13 @@ def _build_server_disk_chart(store, warn_pct, crit_pct, days=30):
 
     # Group by server
     servers: dict[str, list] = {}
+    labels: dict = {}
     for row in history:
         name = row['server_name']
         total = row['total_bytes']
         used = row['used_bytes']
         pct = round(used / total * 100, 1) if total > 0 else 0
-        ts = row['ts']
-        if isinstance(ts, datetime):
-            ts_str = ts.strftime('%Y-%m-%d %H:%M')
-        else:
-            ts_str = str(ts)
+        ts_str = _ts_label(row['ts'], labels)
         servers.setdefault(name, []).append([ts_str, pct])
 
     server_names = list(servers.keys())
@@ -515,15 +525,12 @@ def _build_table_disk_chart(store, server_name: str, top_n: int):
 
     # Group by table
     tables: dict[str, list] = {}
+    labels: dict = {}
     for row in history:
         name = row['table_name']
         if name == '__other__':
             name = '(other)'
-        ts = row['ts']
-        if isinstance(ts, datetime):
-            ts_str = ts.strftime('%Y-%m-%d %H:%M')
-        else:
-            ts_str = str(ts)
+        ts_str = _ts_label(row['ts'], labels)
         size_gb = round(row['size_bytes'] / (1024 ** 3), 2)
         tables.setdefault(name, []).append([ts_str, size_gb])
 
@@ -325,6 +325,13 @@ def _render_server_info_bar(ctx: ServerDetailsContext, disks):
 
 # ── Tables ──
 
+def _refresh_tables(ctx: ServerDetailsContext):
+    """Reload tables, bypassing the service's short-lived result cache."""
+    if state.service:
+        state.service.invalidate_cache()
+    background_tasks.create(_load_tables(ctx))
+
+
 async def _load_tables(ctx: ServerDetailsContext):
     service = state.service
     if not service:
@@ -385,23 +392,23 @@ def _render_tables(ctx: ServerDetailsContext, data, refs, total_disk_bytes=0):
         ]
         rows = []
         for t in data:
-            all_refs = refs.get(t['name'], [])
+            all_refs = refs.get(t.name, [])
             normal_refs = [name for name, engine in all_refs if engine != 'Distributed']
             dist_refs = [name for name, engine in all_refs if engine == 'Distributed']
-            pct = (t['size_bytes'] / total_disk_bytes * 100) if total_disk_bytes > 0 else 0
+            pct = (t.size_bytes / total_disk_bytes * 100) if total_disk_bytes > 0 else 0
             rows.append({
-                'name': t['name'],
-                'size': t['size'],
-                'size_bytes': t['size_bytes'],
+                'name': t.name,
+                'size': t.size,
+                'size_bytes': t.size_bytes,
                 'size_pct': f'{pct:.1f}%' if pct >= 0.05 else '<0.1%',
-                'replicated': t.get('replicated', False),
+                'replicated': t.replicated,
                 'refs_cnt': len(normal_refs),
                 'refs_list': normal_refs,
                 'dist_cnt': len(dist_refs),
                 'dist_list': dist_refs,
-                'ttl': t.get('ttl', ''),
-                'last_select': t['last_select'],
-                'last_insert': t['last_insert'],
+                'ttl': t.ttl,
+                'last_select': t.last_select,
+                'last_insert': t.last_insert,
             })
 
         # Schema filter state
@@ -567,7 +574,7 @@ def _render_tables(ctx: ServerDetailsContext, data, refs, total_disk_bytes=0):
 
         with ui.row().classes('q-mt-sm gap-2'):
             ui.button('Refresh', icon='refresh',
-                      on_click=lambda: background_tasks.create(_load_tables(ctx))).props(
+                      on_click=lambda: _refresh_tables(ctx)).props(
                 'flat dense color=primary'
             ).tooltip('Reload table data')
             ui.button(icon='code', on_click=_show_tables_sql).props(
@@ -625,7 +632,9 @@ async def _load_columns(ctx: ServerDetailsContext, full_table_name: str):
         return
 
     try:
-        col_refs = await run.io_bound(lambda: service.get_column_references(full_table_name))
+        column_names = [c['name'] for c in columns_data]
+        col_refs = await run.io_bound(
+            lambda: service.get_column_references(full_table_name, column_names))
     except Exception:
         col_refs = {}
 
@@ -1204,7 +1213,7 @@ def _load_qmon_iframe(ctx: ServerDetailsContext):
         ).style('width: 100%; height: 100%; border: none')
 
 
-async def _load_text_logs(ctx: ServerDetailsContext):
+async def _load_text_logs(ctx: ServerDetailsContext, force_refresh: bool = False):
     ctx.text_logs_panel.clear()
     service = state.service
     if not service:
@@ -1216,7 +1225,7 @@ async def _load_text_logs(ctx: ServerDetailsContext):
         ui.spinner('dots', size='lg').classes('self-center q-mt-md')
 
     try:
-        data = await run.io_bound(lambda: service.get_text_log_summary())
+        data = await run.io_bound(lambda: service.get_text_log_summary(force_refresh))
     except Exception as ex:
         ctx.text_logs_panel.clear()
         with ctx.text_logs_panel:
@@ -1233,7 +1242,7 @@ async def _load_text_logs(ctx: ServerDetailsContext):
             with splitter.before:
                 ui.button('Refresh', icon='refresh',
                           on_click=lambda: background_tasks.create(
-                              _load_text_logs(ctx))).props('flat dense color=primary').tooltip('Reload logs')
+                              _load_text_logs(ctx, force_refresh=True))).props('flat dense color=primary').tooltip('Reload logs')
 
                 columns = [
                     {'name': 'thread_name', 'label': 'Thread', 'field': 'thread_name', 'align': 'left', 'sortable': True, 'tooltip': 'Thread name'},
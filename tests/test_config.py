@@ -133,6 +133,26 @@ class TestConnectionManager:
         assert "ANOTHER=world" in content
         assert "CLICKHOUSE_CONNECTION_1_NAME=Test" in content
 
+    def test_batch_defers_persist(self, env_file):
+        m = ConnectionManager(env_path=env_file)
+        with m.batch():
+            m.add_connection(ConnectionConfig(name="B1", host="h1"))
+            m.update_connection("B1", ConnectionConfig(name="B2", host="h2"))
+            assert not os.path.exists(env_file)
+
+        conns = ConnectionManager(env_path=env_file).list_connections()
+        assert [c.name for c in conns] == ["B2"]
+
+    def test_persist_keeps_file_mode(self, env_file):
+        with open(env_file, "w") as f:
+            f.write("OTHER_VAR=hello\n")
+        os.chmod(env_file, 0o600)
+
+        ConnectionManager(env_path=env_file).add_connection(ConnectionConfig(name="A", host="h"))
+
+        assert os.stat(env_file).st_mode & 0o777 == 0o600
+        assert os.listdir(os.path.dirname(env_file)) == [".env"]
+
 
 class TestIntegrationClient:
     @pytest.mark.integration
@@ -0,0 +1,61 @@
+import os
+import re
+
+from ch_analyser import env_cache
+
+
+def test_load_env_reuses_parsed_values(tmp_path):
+    path = str(tmp_path / ".env")
+    with open(path, "w") as f:
+        f.write("A=1\n")
+
+    first = env_cache.load_env(path)
+    assert first == {"A": "1"}
+    assert env_cache.load_env(path) is first
+
+
+def test_load_env_reparses_after_change(tmp_path):
+    path = str(tmp_path / ".env")
+    with open(path, "w") as f:
+        f.write("A=1\n")
+    env_cache.load_env(path)
+
+    with open(path, "w") as f:
+        f.write("A=22\n")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    assert env_cache.load_env(path) == {"A": "22"}
+
+
+def test_invalidate_forces_reparse(tmp_path):
+    path = str(tmp_path / ".env")
+    with open(path, "w") as f:
+        f.write("A=1\n")
+    first = env_cache.load_env(path)
+
+    env_cache.invalidate(path)
+    assert env_cache.load_env(path) is not first
+
+
+def test_load_env_shares_entry_across_path_spellings(tmp_path, monkeypatch):
+    path = tmp_path / ".env"
+    path.write_text("A=1\n")
+    monkeypatch.chdir(tmp_path)
+
+    assert env_cache.load_env(".env") is env_cache.load_env(str(path))
+
+
+def test_parse_indexed_groups_fields_by_index():
+    values = {
+        "APP_USER_2_NAME": "bob",
+        "APP_USER_1_NAME": "alice",
+        "APP_USER_1_ROLE": None,
+        "OTHER": "x",
+    }
+    pattern = re.compile(r"^APP_USER_(\d+)_(.+)$")
+
+    assert env_cache.parse_indexed(values, "APP_USER_", pattern) == {
+        1: {"NAME": "alice", "ROLE": ""},
+        2: {"NAME": "bob"},
+    }
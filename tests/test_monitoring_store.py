@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+
+import duckdb
+import pytest
+
+from ch_analyser.monitoring.store import MonitoringStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = MonitoringStore(db_path=str(tmp_path / "monitoring.duckdb"))
+    yield s
+    s.close()
+
+
+def _tables(n, size=100):
+    return [{"database": "db", "table": f"t{i}", "size_bytes": size * (i + 1)} for i in range(n)]
+
+
+class TestInsert:
+    def test_insert_server_disk(self, store):
+        ts = datetime.now()
+        store.insert_server_disk(ts, "srv", [
+            {"name": "default", "total_bytes": 1000, "used_bytes": 400},
+            {"name": "cold", "total_bytes": 2000, "used_bytes": 100},
+        ])
+        latest = store.get_server_disk_latest()
+        assert len(latest) == 1
+        assert latest[0]["server_name"] == "srv"
+        assert latest[0]["total_bytes"] == 3000
+        assert latest[0]["used_bytes"] == 500
+
+    def test_insert_is_idempotent_per_hour(self, store):
+        ts = datetime.now().replace(minute=5)
+        store.insert_table_sizes(ts, "srv", _tables(3))
+        store.insert_table_sizes(ts.replace(minute=40), "srv", _tables(5))
+        assert len(store.get_table_disk_latest("srv")) == 3
+
+    def test_insert_empty_list(self, store):
+        store.insert_table_sizes(datetime.now(), "srv", [])
+        assert store.get_table_disk_latest("srv") == []
+
+    def test_recorded_snapshots(self, store):
+        ts = datetime.now().replace(minute=5)
+        assert store.recorded_snapshots(ts, "srv") == (False, False)
+        store.insert_table_sizes(ts, "srv", _tables(1))
+        assert store.recorded_snapshots(ts.replace(minute=50), "srv") == (False, True)
+
+
+class TestHistory:
+    def test_table_history_groups_other(self, store):
+        now = datetime.now()
+        for h in (2, 1):
+            store.insert_table_sizes(now - timedelta(hours=h), "srv", _tables(4))
+        rows = store.get_table_disk_history("srv", days=1, top_n=2)
+
+        names = {r["table_name"] for r in rows}
+        assert names == {"db.t3", "db.t2", "__other__"}
+        other = [r for r in rows if r["table_name"] == "__other__"]
+        assert len(other) == 2
+        assert all(r["size_bytes"] == 300 for r in other)
+        assert all(isinstance(r["ts"], datetime) for r in other)
+
+
+def test_cleanup_expired(store):
+    store.insert_server_disk(datetime.now() - timedelta(days=10), "srv", [
+        {"name": "default", "total_bytes": 1, "used_bytes": 1},
+    ])
+    store.insert_server_disk(datetime.now(), "srv", [
+        {"name": "default", "total_bytes": 1, "used_bytes": 1},
+    ])
+    store.cleanup_expired(retention_days=5)
+    assert len(store.get_server_disk_history(days=30)) == 1
+
+
+def test_rename_server(store):
+    store.insert_table_sizes(datetime.now(), "old", _tables(1))
+    store.rename_server("old", "new")
+    assert store.get_table_disk_latest("old") == []
+    assert len(store.get_table_disk_latest("new")) == 1
+
+
+def test_migrates_stored_year_column(tmp_path):
+    path = str(tmp_path / "monitoring.duckdb")
+    conn = duckdb.connect(path)
+    conn.execute(
+        "CREATE TABLE table_disk_snapshots (ts TIMESTAMP NOT NULL, year SMALLINT NOT NULL, "
+        "server_name VARCHAR NOT NULL, database_name VARCHAR NOT NULL, "
+        "table_name VARCHAR NOT NULL, size_bytes BIGINT NOT NULL)"
+    )
+    conn.execute("CREATE INDEX idx_table_disk_ts ON table_disk_snapshots (server_name, ts)")
+    conn.execute("INSERT INTO table_disk_snapshots VALUES ('2024-05-01 10:00', 2024, 'srv', 'db', 't', 7)")
+    conn.close()
+
+    s = MonitoringStore(db_path=path)
+    try:
+        assert s.get_table_disk_latest("srv") == [
+            {"database_name": "db", "table_name": "t", "size_bytes": 7},
+        ]
+        s.insert_table_sizes(datetime(2025, 1, 1, 3), "srv", _tables(1))
+        assert len(s.get_table_disk_history("srv", days=100000)) == 2
+    finally:
+        s.close()
@@ -0,0 +1,22 @@
+from ch_analyser.sql_format import format_clickhouse_sql
+
+
+def test_function_case_restored():
+    sql = "select countif(x > 1), dictgetordefault('d', 'a', touint64(id)) from t"
+
+    assert format_clickhouse_sql(sql) == (
+        "SELECT countIf(x > 1),\n"
+        "       dictGetOrDefault('d', 'a', toUInt64(id))\n"
+        "FROM t"
+    )
+
+
+def test_unknown_and_partial_names_untouched():
+    sql = "select mytodate(x), todate_local(y), todate (z) from t"
+
+    assert format_clickhouse_sql(sql) == (
+        "SELECT mytodate(x),\n"
+        "       todate_local(y),\n"
+        "       toDate(z)\n"
+        "FROM t"
+    )
@@ -0,0 +1,103 @@
+from ch_analyser.services import AnalysisService
+
+
+class FakeClient:
+    def __init__(self, tables, columns=()):
+        self._tables = tables
+        self._columns = [{"name": c} for c in columns]
+
+    def execute(self, query, params=None):
+        if "system.columns" in query:
+            return self._columns
+        return self._tables
+
+
+def _table(db, name, engine, ddl):
+    return {"database": db, "name": name, "engine": engine, "create_table_query": ddl}
+
+
+TABLES = [
+    _table("db", "src", "MergeTree", "CREATE TABLE db.src (id UInt64, value String) ENGINE = MergeTree"),
+    _table("db", "dst", "MergeTree", "CREATE TABLE db.dst (id UInt64) ENGINE = MergeTree"),
+    _table("db", "mv", "MaterializedView",
+           "CREATE MATERIALIZED VIEW db.mv TO db.dst (id UInt64) AS SELECT id FROM src"),
+    _table("other", "src", "MergeTree", "CREATE TABLE other.src (id UInt64) ENGINE = MergeTree"),
+    _table("other", "dist", "Distributed",
+           "CREATE TABLE other.dist (id UInt64) ENGINE = Distributed('c', 'db', 'src', rand())"),
+    _table("other", "v", "View", "CREATE VIEW other.v AS SELECT * FROM db.src_archive"),
+]
+
+
+def test_table_references():
+    refs = AnalysisService(FakeClient(TABLES)).get_table_references()
+
+    # Short name resolves within the same database only; TO target is a destination
+    assert refs == {
+        "db.src": [("db.mv", "MaterializedView"), ("other.dist", "Distributed")],
+    }
+
+
+def test_table_references_non_word_names():
+    tables = TABLES + [
+        _table("db", "my-table", "MergeTree", "CREATE TABLE db.`my-table` (id UInt64) ENGINE = MergeTree"),
+        _table("db", "reader", "View", "CREATE VIEW db.reader AS SELECT * FROM db.my-table"),
+    ]
+    refs = AnalysisService(FakeClient(tables)).get_table_references()
+
+    assert refs["db.my-table"] == [("db.reader", "View")]
+
+
+def test_column_references():
+    service = AnalysisService(FakeClient(TABLES, columns=("id", "value")))
+
+    assert service.get_column_references("db.src") == {
+        "id": [("db.mv", "MaterializedView"), ("other.dist", "Distributed")],
+    }
+
+
+def test_column_references_with_known_columns():
+    # Column names from the caller replace the system.columns lookup
+    service = AnalysisService(FakeClient(TABLES))
+
+    assert service.get_column_references("db.src", ["id", "value"]) == {
+        "id": [("db.mv", "MaterializedView"), ("other.dist", "Distributed")],
+    }
+
+
+def test_references_cached_until_invalidated():
+    client = FakeClient(TABLES)
+    calls = []
+    execute = client.execute
+    client.execute = lambda query, params=None: calls.append(query) or execute(query, params)
+    service = AnalysisService(client)
+
+    first = service.get_table_references()
+    assert service.get_table_references() is first
+    assert len(calls) == 1
+
+    service.invalidate_cache()
+    assert service.get_table_references() == first
+    assert len(calls) == 2
+
+
+def test_column_references_unreferenced_table_skips_columns_lookup():
+    client = FakeClient(TABLES, columns=("id",))
+    queries = []
+    execute = client.execute
+    client.execute = lambda query, params=None: queries.append(query) or execute(query, params)
+
+    assert AnalysisService(client).get_column_references("other.src") == {}
+    assert not any("system.columns" in q for q in queries)
+
+
+def test_table_references_non_word_database():
+    tables = [
+        _table("x-y", "src", "MergeTree", "CREATE TABLE x-y.src (id UInt64) ENGINE = MergeTree"),
+        _table("x-y", "dst", "MergeTree", "CREATE TABLE x-y.dst (id UInt64) ENGINE = MergeTree"),
+        _table("x-y", "mv", "MaterializedView",
+               "CREATE MATERIALIZED VIEW x-y.mv TO x-y.dst (id UInt64) AS SELECT id FROM src"),
+    ]
+    refs = AnalysisService(FakeClient(tables)).get_table_references()
+
+    # Each referrer listed once; the TO destination is not a reference
+    assert refs == {"x-y.src": [("x-y.mv", "MaterializedView")]}